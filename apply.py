@@ -1,5 +1,6 @@
 import PyQt6.QtWidgets as W
-from typing import Any, final
+import PyQt6.QtCore as C
+from typing import Any, Callable, final, override
 import os
 
 import chooser
@@ -9,8 +10,14 @@ import mypy
 
 @final
 class ApplyDialog(W.QDialog):
-    def __init__(self, *args: Any, **kwargs: Any):
+    def __init__(
+        self,
+        *args: Any,
+        preflight: "Callable[[ApplyDialog], list[str]] | None" = None,
+        **kwargs: Any
+    ):
         self.max_decimals = 10
+        self.preflight = preflight
 
         super(ApplyDialog, self).__init__(*args, **kwargs)
         self.setWindowTitle("Apply Modifications")
@@ -20,6 +27,8 @@ class ApplyDialog(W.QDialog):
         form_layout.addWidget(W.QLabel("Starting number"), 2, 0)
         form_layout.addWidget(W.QLabel("Decimals"), 3, 0)
         form_layout.addWidget(W.QLabel("Move mode"), 4, 0)
+        form_layout.addWidget(W.QLabel("Export size"), 5, 0)
+        form_layout.addWidget(W.QLabel("Export quality"), 6, 0)
 
         target_directory_layout = W.QHBoxLayout()
         self.target_directory_edit = W.QLineEdit()
@@ -57,6 +66,14 @@ class ApplyDialog(W.QDialog):
             mypy.click_callback(lambda: self._calculate_starting_number(True))
         )
         starting_number_layout.addWidget(self.calculate_starting_number_button)
+
+        self.merge_check_box = W.QCheckBox("Merge by date")
+        self.merge_check_box.setToolTip(
+            "Insert the items into the existing numbered files of the target "
+            "directory by date, renaming as few of them as possible."
+        )
+        self.merge_check_box.setChecked(config.config.get("merge", False))
+        starting_number_layout.addWidget(self.merge_check_box)
         form_layout.addLayout(starting_number_layout, 2, 1)
 
         self.decimals_edit = W.QSpinBox()
@@ -70,29 +87,65 @@ class ApplyDialog(W.QDialog):
 
         self.rename_button = W.QRadioButton("Move")
         self.copy_button = W.QRadioButton("Copy")
+        self.export_button = W.QRadioButton("Export")
+        self.verify_check_box = W.QCheckBox("Verify")
+        self.verify_check_box.setChecked(
+            config.config.get("verify_copy", False)
+        )
+        _ = self.copy_button.toggled.connect(self.verify_check_box.setEnabled)
         copy = config.config.get("copy", False)
-        if copy:
+        export = config.config.get("export", False)
+        if export:
+            self.export_button.setChecked(True)
+        elif copy:
             self.copy_button.setChecked(True)
         else:
             self.rename_button.setChecked(True)
+        self.verify_check_box.setEnabled(copy and not export)
 
         move_type_layout = W.QHBoxLayout()
         move_type_layout.addWidget(self.rename_button)
         move_type_layout.addWidget(self.copy_button)
+        move_type_layout.addWidget(self.verify_check_box)
+        move_type_layout.addWidget(self.export_button)
         form_layout.addLayout(move_type_layout, 4, 1)
 
+        self.export_size_edit = W.QSpinBox()
+        self.export_size_edit.setRange(16, 65535)
+        self.export_size_edit.setSuffix(" px")
+        self.export_size_edit.setValue(config.config.get("export_size", 2048))
+        self.export_size_edit.setEnabled(export)
+        _ = self.export_button.toggled.connect(self.export_size_edit.setEnabled)
+        form_layout.addWidget(self.export_size_edit, 5, 1)
+
+        self.export_quality_edit = W.QSpinBox()
+        self.export_quality_edit.setRange(1, 100)
+        self.export_quality_edit.setValue(
+            config.config.get("export_quality", 85)
+        )
+        self.export_quality_edit.setEnabled(export)
+        _ = self.export_button.toggled.connect(
+            self.export_quality_edit.setEnabled
+        )
+        form_layout.addWidget(self.export_quality_edit, 6, 1)
+
         layout = W.QVBoxLayout()
         layout.addLayout(form_layout)
 
+        self.problems_label = W.QLabel()
+        self.problems_label.setWordWrap(True)
+        self.problems_label.setTextInteractionFlags(
+            C.Qt.TextInteractionFlag.TextSelectableByMouse
+        )
+        self.problems_label.hide()
+        layout.addWidget(self.problems_label)
+
         self.button_box = W.QDialogButtonBox(
             W.QDialogButtonBox.StandardButton.Ok
             | W.QDialogButtonBox.StandardButton.Cancel,
         )
         _ = self.button_box.accepted.connect(self.accept)
         _ = self.button_box.rejected.connect(self.reject)
-        ok_button = self.button_box.button(W.QDialogButtonBox.StandardButton.Ok)
-        assert ok_button is not None
-        _ = ok_button.clicked.connect(mypy.click_callback(self._commit))
         layout.addWidget(self.button_box)
 
         self.setLayout(layout)
@@ -104,11 +157,27 @@ class ApplyDialog(W.QDialog):
         self._calculate_starting_number_limits(decimals)
         self._calculate_dir(path)
 
+    @override
+    def accept(self) -> None:
+        if self.preflight is not None:
+            problems = self.preflight(self)
+            if problems:
+                self.problems_label.setText("\n\n".join(problems))
+                self.problems_label.show()
+                return
+        self._commit()
+        super(ApplyDialog, self).accept()
+
     def _commit(self) -> None:
         config.config["last_target_dir"] = self.get_target_directory()
         config.config["decimals"] = self.get_decimals()
         config.config["prefix"] = self.get_prefix()
         config.config["copy"] = self.is_copy()
+        config.config["merge"] = self.is_merge()
+        config.config["verify_copy"] = self.verify_check_box.isChecked()
+        config.config["export"] = self.is_export()
+        config.config["export_size"] = self.get_export_size()
+        config.config["export_quality"] = self.get_export_quality()
         size = self.size()
         config.config["apply_dialog_width"] = size.width()
         config.config["apply_dialog_height"] = size.height()
@@ -176,5 +245,20 @@ class ApplyDialog(W.QDialog):
     def get_target_directory(self) -> str:
         return self.target_directory_edit.text()
 
+    def is_merge(self) -> bool:
+        return self.merge_check_box.isChecked()
+
     def is_copy(self) -> bool:
         return self.copy_button.isChecked()
+
+    def is_verified_copy(self) -> bool:
+        return self.is_copy() and self.verify_check_box.isChecked()
+
+    def is_export(self) -> bool:
+        return self.export_button.isChecked()
+
+    def get_export_size(self) -> int:
+        return self.export_size_edit.value()
+
+    def get_export_quality(self) -> int:
+        return self.export_quality_edit.value()
@@ -0,0 +1,103 @@
+import datetime
+import hashlib
+import os
+import shutil
+import tempfile
+
+chunk_size = 8 * 1024 * 1024
+hash_name = "sha256"
+
+
+class VerificationError(Exception):
+    pass
+
+
+def _drop_cache(fd: int) -> None:
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.new(hash_name)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            length = f.readinto(buffer)
+            if not length:
+                break
+            digest.update(view[:length])
+    return digest.hexdigest()
+
+
+def _copy(source: str, target: str, fd: int) -> tuple[int, str]:
+    digest = hashlib.new(hash_name)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    size = 0
+    with open(source, "rb", buffering=0) as src, open(
+        fd, "wb", buffering=0
+    ) as dst:
+        while True:
+            length = src.readinto(buffer)
+            if not length:
+                break
+            digest.update(view[:length])
+            written = 0
+            while written < length:
+                written += dst.write(view[written:length])
+            size += length
+        os.fsync(dst.fileno())
+        _drop_cache(dst.fileno())
+    shutil.copymode(source, target)
+    return size, digest.hexdigest()
+
+
+def verified_copy(source: str, target: str) -> tuple[int, str]:
+    # Only a verified copy gets the target name, so that a failed or corrupt
+    # one is never mistaken for a good one.
+    directory, name = os.path.split(target)
+    fd, temporary = tempfile.mkstemp(
+        prefix="." + name + ".", suffix=".tmp", dir=directory or None
+    )
+    try:
+        size, source_hash = _copy(source, temporary, fd)
+        target_hash = hash_file(temporary)
+        if target_hash != source_hash:
+            raise VerificationError(
+                "Checksum mismatch after copying {} to {}".format(
+                    source, target
+                )
+            )
+        os.replace(temporary, target)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+    return size, source_hash
+
+
+def write_manifest(directory: str, entries: list[tuple[str, int, str]]) -> str:
+    # Copies that finish within the same microsecond still must not
+    # overwrite each other's manifest.
+    name = datetime.datetime.now().strftime("manifest-%Y%m%d-%H%M%S-%f")
+    path = os.path.join(directory, name + ".tsv")
+    suffix = 0
+    while True:
+        try:
+            f = open(path, "x")
+            break
+        except FileExistsError:
+            suffix += 1
+            path = os.path.join(directory, "{}-{}.tsv".format(name, suffix))
+    with f:
+        _ = f.write("path\tsize\t{}\n".format(hash_name))
+        for entry_path, size, digest in entries:
+            _ = f.write(
+                "{}\t{}\t{}\n".format(
+                    os.path.relpath(entry_path, directory), size, digest
+                )
+            )
+    return path
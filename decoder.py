@@ -0,0 +1,232 @@
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+import collections
+import concurrent.futures as futures
+import functools
+import multiprocessing
+import multiprocessing.shared_memory as shared_memory
+import traceback
+from typing import Any, Callable, Hashable, cast, final
+
+import thumbnails
+
+image_format = G.QImage.Format.Format_ARGB32_Premultiplied
+bytes_per_pixel = 4
+
+_worker_memory: shared_memory.SharedMemory | None = None
+
+
+def _get_worker_memory(name: str) -> shared_memory.SharedMemory:
+    global _worker_memory
+    if _worker_memory is None or _worker_memory.name != name:
+        if _worker_memory is not None:
+            _worker_memory.close()
+        _worker_memory = shared_memory.SharedMemory(name)
+    return _worker_memory
+
+
+def _decode(
+    memory_name: str,
+    offset: int,
+    slot_size: int,
+    filename: str,
+    size: int,
+    load_size: int,
+    orientation: int | None,
+    shared: bool,
+) -> tuple[int, int, int]:
+    image = thumbnails.create(filename, size, load_size, orientation, shared)
+    if image.isNull():
+        return 0, 0, 0
+    image = image.convertToFormat(image_format)
+    length = image.sizeInBytes()
+    if length > slot_size:
+        raise ValueError("Decoded image does not fit into slot: " + filename)
+
+    bits = image.constBits()
+    assert bits is not None
+    bits.setsize(length)
+    buffer = _get_worker_memory(memory_name).buf
+    assert buffer is not None
+    buffer[offset : offset + length] = memoryview(cast(bytes, bits))
+    return image.width(), image.height(), image.bytesPerLine()
+
+
+@final
+class DecodedEvent(C.QEvent):
+    EventType: int | None = None
+
+    def __init__(self, job: "_Job", future: "futures.Future[Any]"):
+        if DecodedEvent.EventType is None:
+            DecodedEvent.EventType = C.QEvent.registerEventType()
+        self.job = job
+        self.future = future
+        super(DecodedEvent, self).__init__(
+            cast(C.QEvent.Type, DecodedEvent.EventType)
+        )
+
+
+@final
+class _Slab:
+    def __init__(self, slots: int, slot_size: int):
+        self.slot_size = slot_size
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=slots * slot_size
+        )
+        self.free = list(range(slots))
+        self.in_flight = 0
+        self.retired = False
+
+    def close(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+
+@final
+class _Job:
+    def __init__(
+        self,
+        key: Hashable,
+        callback: Callable[[G.QImage], None],
+        filename: str,
+        size: int,
+        load_size: int,
+        orientation: int | None,
+        shared: bool,
+    ):
+        self.key = key
+        self.callback = callback
+        self.filename = filename
+        self.size = size
+        self.load_size = load_size
+        self.orientation = orientation
+        self.shared = shared
+        self.slab: _Slab | None = None
+        self.slot = 0
+
+
+@final
+class Decoder:
+    def __init__(self, receiver: C.QObject, processes: int):
+        self.receiver = receiver
+        self.slots = processes * 2
+        self.executor = futures.ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.slab: _Slab | None = None
+        self.pending: collections.deque[_Job] = collections.deque()
+        self.keys: set[Hashable] = set()
+
+    def request(
+        self,
+        key: Hashable,
+        callback: Callable[[G.QImage], None],
+        filename: str,
+        size: int,
+        load_size: int,
+        orientation: int | None,
+        shared: bool,
+    ) -> None:
+        if key in self.keys:
+            return
+        self.keys.add(key)
+        self.pending.append(
+            _Job(
+                key,
+                callback,
+                filename,
+                size,
+                load_size,
+                orientation,
+                shared,
+            )
+        )
+        self._submit()
+
+    def cancel(self) -> None:
+        for job in self.pending:
+            self.keys.discard(job.key)
+        self.pending.clear()
+
+    def is_idle(self) -> bool:
+        return not self.keys
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.slab is not None:
+            self.slab.retired = True
+            self._release_slab(self.slab)
+
+    def _get_slab(self, load_size: int) -> _Slab:
+        slot_size = load_size * load_size * bytes_per_pixel
+        if self.slab is None or self.slab.slot_size != slot_size:
+            if self.slab is not None:
+                self.slab.retired = True
+                self._release_slab(self.slab)
+            self.slab = _Slab(self.slots, slot_size)
+        return self.slab
+
+    def _release_slab(self, slab: _Slab) -> None:
+        if slab.retired and slab.in_flight == 0:
+            slab.close()
+
+    def _submit(self) -> None:
+        while self.pending:
+            slab = self._get_slab(self.pending[0].load_size)
+            if not slab.free:
+                return
+            job = self.pending.popleft()
+            job.slab = slab
+            job.slot = slab.free.pop()
+            slab.in_flight += 1
+            future = self.executor.submit(
+                _decode,
+                slab.memory.name,
+                job.slot * slab.slot_size,
+                slab.slot_size,
+                job.filename,
+                job.size,
+                job.load_size,
+                job.orientation,
+                job.shared,
+            )
+            future.add_done_callback(functools.partial(self._post, job))
+
+    def _post(self, job: _Job, future: "futures.Future[Any]") -> None:
+        C.QCoreApplication.postEvent(self.receiver, DecodedEvent(job, future))
+
+    def receive(self, event: DecodedEvent) -> None:
+        job = event.job
+        slab = job.slab
+        assert slab is not None
+        try:
+            width, height, bytes_per_line = event.future.result()
+            if width != 0:
+                buffer = slab.memory.buf
+                assert buffer is not None
+                offset = job.slot * slab.slot_size
+                view = buffer[offset : offset + bytes_per_line * height]
+                try:
+                    image = G.QImage(
+                        cast(bytes, view),
+                        width,
+                        height,
+                        bytes_per_line,
+                        image_format,
+                    )
+                    job.callback(image)
+                    del image
+                finally:
+                    view.release()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self.keys.discard(job.key)
+            slab.in_flight -= 1
+            if slab.retired:
+                self._release_slab(slab)
+            else:
+                slab.free.append(job.slot)
+            self._submit()
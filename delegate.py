@@ -0,0 +1,121 @@
+import PyQt6.QtWidgets as W
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+from typing import final, override
+
+separation = 10
+max_texts = 10000
+
+_decoration_role = C.Qt.ItemDataRole.DecorationRole
+_display_role = C.Qt.ItemDataRole.DisplayRole
+_selected = W.QStyle.StateFlag.State_Selected
+
+
+@final
+class ThumbnailDelegate(W.QStyledItemDelegate):
+    def __init__(self, parent: C.QObject | None = None):
+        super(ThumbnailDelegate, self).__init__(parent)
+        self.picture_size = 0
+        self.text_height = 0
+        self.size = C.QSize()
+        self.elide_mode = C.Qt.TextElideMode.ElideRight
+        self.texts: dict[str, tuple[G.QStaticText, int]] = {}
+
+    def set_picture_size(self, picture_size: int, font: G.QFont) -> None:
+        self.picture_size = picture_size
+        self.text_height = G.QFontMetrics(font).height()
+        self.size = C.QSize(picture_size, picture_size + self.text_height)
+        self.texts.clear()
+
+    def get_grid_size(self) -> C.QSize:
+        return self.size + C.QSize(separation, separation)
+
+    def _get_text(
+        self, text: str, font_metrics: G.QFontMetrics
+    ) -> tuple[G.QStaticText, int]:
+        # Eliding and laying out the text is the most expensive part of
+        # painting a cell, do it once per file name.
+        result = self.texts.get(text)
+        if result is None:
+            if len(self.texts) >= max_texts:
+                self.texts.clear()
+            elided = font_metrics.elidedText(
+                text, self.elide_mode, self.picture_size
+            )
+            static_text = G.QStaticText(elided)
+            static_text.setTextFormat(C.Qt.TextFormat.PlainText)
+            result = (static_text, font_metrics.horizontalAdvance(elided))
+            self.texts[text] = result
+        return result
+
+    def get_cache_key(self, icon: G.QIcon, ratio: float) -> str:
+        return "thumbnail:{}:{}:{}".format(
+            icon.cacheKey(), self.picture_size, ratio
+        )
+
+    def _get_pixmap(self, icon: G.QIcon, ratio: float) -> G.QPixmap:
+        key = self.get_cache_key(icon, ratio)
+        pixmap = G.QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = icon.pixmap(
+                C.QSize(self.picture_size, self.picture_size), ratio
+            )
+            _ = G.QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+    @override
+    def paint(
+        self,
+        painter: G.QPainter | None,
+        option: W.QStyleOptionViewItem,
+        index: C.QModelIndex,
+    ) -> None:
+        assert painter is not None
+        rect = option.rect
+        palette = option.palette
+        left = rect.left()
+        top = rect.top()
+        width = rect.width()
+        size = self.picture_size
+        selected = option.state & _selected
+        if selected:
+            painter.fillRect(rect, palette.highlight())
+
+        icon = index.data(_decoration_role)
+        if isinstance(icon, G.QIcon) and not icon.isNull():
+            device = painter.device()
+            assert device is not None
+            pixmap = self._get_pixmap(icon, device.devicePixelRatioF())
+            ratio = pixmap.devicePixelRatio()
+            painter.drawPixmap(
+                left + (width - round(pixmap.width() / ratio)) // 2,
+                top + (size - round(pixmap.height() / ratio)) // 2,
+                pixmap,
+            )
+        else:
+            # Items that are not loaded yet only get a placeholder.
+            margin = size // 8
+            painter.fillRect(
+                left + (width - size) // 2 + margin,
+                top + margin,
+                size - 2 * margin,
+                size - 2 * margin,
+                palette.midlight(),
+            )
+
+        text = index.data(_display_role)
+        if text:
+            static_text, text_width = self._get_text(text, option.fontMetrics)
+            if selected:
+                painter.setPen(palette.highlightedText().color())
+            else:
+                painter.setPen(palette.text().color())
+            painter.drawStaticText(
+                left + (width - text_width) // 2, top + size, static_text
+            )
+
+    @override
+    def sizeHint(
+        self, option: W.QStyleOptionViewItem, index: C.QModelIndex
+    ) -> C.QSize:
+        return self.size
@@ -0,0 +1,93 @@
+import os
+import struct
+import sys
+from typing import Callable, Iterator
+
+if sys.platform == "linux":
+    import fcntl
+
+# Metadata and embedded thumbnails are in the APP1 segment, which is at most
+# 64 KiB long.
+header_size = 65536
+# Decoding a picture reads the whole file, but hinting more than this per file
+# would only push the rest of the group out of the cache on large files.
+picture_size = 2**20
+group_size = 64
+
+_fiemap = 0xC020660B  # _IOWR('f', 11, struct fiemap)
+_fiemap_flag_sync = 0x1
+_fiemap_extent_unknown = 0x2
+_fiemap_header = struct.Struct("=QQIIII")
+_fiemap_extent = struct.Struct("=QQQQQIIII")
+
+
+def _get_physical_offset(fd: int) -> int | None:
+    if sys.platform != "linux":
+        return None
+    buffer = bytearray(_fiemap_header.size + _fiemap_extent.size)
+    _fiemap_header.pack_into(
+        buffer, 0, 0, 2**64 - 1, _fiemap_flag_sync, 0, 1, 0
+    )
+    try:
+        _ = fcntl.ioctl(fd, _fiemap, buffer)
+    except OSError:
+        return None
+    mapped_extents = _fiemap_header.unpack_from(buffer)[3]
+    if mapped_extents == 0:
+        return None
+    extent = _fiemap_extent.unpack_from(buffer, _fiemap_header.size)
+    if extent[5] & _fiemap_extent_unknown:
+        return None
+    physical: int = extent[1]
+    return physical
+
+
+def get_key(path: str) -> tuple[int, int, int]:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return (-1, 0, 0)
+    try:
+        stat = os.fstat(fd)
+        offset = _get_physical_offset(fd)
+    finally:
+        os.close(fd)
+    # Without extent information the inode number is the best guess, as
+    # file systems tend to allocate data near the inode.
+    if offset is None:
+        return (stat.st_dev, 1, stat.st_ino)
+    return (stat.st_dev, 0, offset)
+
+
+def prefetch(paths: list[str], length: int) -> None:
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def schedule(
+    paths: list[str], check: Callable[[], None], length: int = header_size
+) -> Iterator[int]:
+    keys: list[tuple[tuple[int, int, int], int]] = []
+    for i, path in enumerate(paths):
+        keys.append((get_key(path), i))
+        check()
+    keys.sort()
+
+    order = [i for _, i in keys]
+    for start in range(0, len(order), group_size):
+        group = order[start : start + group_size]
+        # Queue the reads of the whole group at once, so that the kernel can
+        # merge neighbouring ones before they are needed.
+        prefetch([paths[i] for i in group], length)
+        yield from group
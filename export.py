@@ -0,0 +1,134 @@
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+import exifread
+import os
+import struct
+import tempfile
+
+ascii_type = 2
+long_type = 4
+exif_pointer_tag = 0x8769
+
+ifd0_tags: dict[str, int] = {
+    "Image DateTime": 0x0132,
+}
+
+exif_tags: dict[str, int] = {
+    "EXIF DateTimeOriginal": 0x9003,
+    "EXIF DateTimeDigitized": 0x9004,
+    "EXIF OffsetTime": 0x9010,
+    "EXIF OffsetTimeOriginal": 0x9011,
+    "EXIF OffsetTimeDigitized": 0x9012,
+    "EXIF SubSecTime": 0x9290,
+    "EXIF SubSecTimeOriginal": 0x9291,
+    "EXIF SubSecTimeDigitized": 0x9292,
+}
+
+Entry = tuple[int, int, int, bytes]
+
+
+def _ascii_entry(tag: int, value: str) -> Entry:
+    data = value.encode("ascii", "replace") + b"\0"
+    return tag, ascii_type, len(data), data
+
+
+def _write_ifd(entries: list[Entry], offset: int) -> bytes:
+    entries = sorted(entries)
+    data_offset = offset + 2 + 12 * len(entries) + 4
+    header = struct.pack("<H", len(entries))
+    data = b""
+    for tag, field_type, count, value in entries:
+        if len(value) <= 4:
+            field = value.ljust(4, b"\0")
+        else:
+            field = struct.pack("<I", data_offset + len(data))
+            data += value
+            if len(data) % 2 != 0:
+                data += b"\0"
+        header += struct.pack("<HHI", tag, field_type, count) + field
+    return header + struct.pack("<I", 0) + data
+
+
+def _read_dates(filename: str) -> tuple[list[Entry], list[Entry]]:
+    with open(filename, "rb") as f:
+        data = exifread.process_file(f, details=False)
+
+    def get_entries(tags: dict[str, int]) -> list[Entry]:
+        result: list[Entry] = []
+        for name, tag in tags.items():
+            value = data.get(name)
+            if value is not None:
+                result.append(_ascii_entry(tag, str(value.values).strip()))
+        return result
+
+    return get_entries(ifd0_tags), get_entries(exif_tags)
+
+
+def create_exif_segment(filename: str) -> bytes:
+    ifd0, exif = _read_dates(filename)
+    if not ifd0 and not exif:
+        return b""
+
+    header_size = 8
+    if exif:
+        pointer: Entry = (exif_pointer_tag, long_type, 1, b"\0" * 4)
+        exif_offset = header_size + len(_write_ifd(ifd0 + [pointer], 8))
+        pointer = (
+            exif_pointer_tag,
+            long_type,
+            1,
+            struct.pack("<I", exif_offset),
+        )
+        ifd0 = ifd0 + [pointer]
+    tiff = b"II*\0" + struct.pack("<I", header_size)
+    tiff += _write_ifd(ifd0, header_size)
+    if exif:
+        tiff += _write_ifd(exif, len(tiff))
+
+    payload = b"Exif\0\0" + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def export_image(source: str, target: str, size: int, quality: int) -> int:
+    reader = G.QImageReader(source)
+    reader.setAutoTransform(True)
+    original_size = reader.size()
+    if original_size.isValid() and (
+        original_size.width() > size or original_size.height() > size
+    ):
+        reader.setScaledSize(
+            original_size.scaled(
+                size, size, C.Qt.AspectRatioMode.KeepAspectRatio
+            )
+        )
+    image = reader.read()
+    if image.isNull():
+        raise OSError(
+            "Failed to read {}: {}".format(source, reader.errorString())
+        )
+
+    buffer = C.QBuffer()
+    _ = buffer.open(C.QIODevice.OpenModeFlag.WriteOnly)
+    if not image.save(buffer, "JPG", quality):
+        raise OSError("Failed to encode " + source)
+    data = buffer.data().data()
+    exif = create_exif_segment(source)
+
+    # Like a verified copy, only a complete file gets the target name.
+    directory, name = os.path.split(target)
+    fd, temporary = tempfile.mkstemp(
+        prefix="." + name + ".", suffix=".tmp", dir=directory or None
+    )
+    try:
+        with open(fd, "wb") as f:
+            _ = f.write(data[:2])
+            _ = f.write(exif)
+            _ = f.write(data[2:])
+        os.replace(temporary, target)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+    return len(data) + len(exif)
@@ -0,0 +1,298 @@
+import PyQt6.QtGui as G
+import abc
+import json
+import os
+import sys
+import traceback
+from typing import Any, Protocol, final, override
+
+Ranges = list[tuple[int, int]]
+
+
+class Editor(Protocol):
+    def create_items(
+        self, ids: list[int], filenames: list[str]
+    ) -> list[G.QStandardItem]: ...
+
+    def drop_items(self, items: list[G.QStandardItem]) -> None: ...
+
+    def take_unsorted(self, ids: list[int]) -> list[G.QStandardItem]: ...
+
+    def append_unsorted(self, items: list[G.QStandardItem]) -> None: ...
+
+    def put_unsorted(self, items: list[G.QStandardItem]) -> None: ...
+
+    def take_sorted(self, ranges: Ranges) -> list[G.QStandardItem]: ...
+
+    def insert_sorted(
+        self, ranges: Ranges, items: list[G.QStandardItem]
+    ) -> None: ...
+
+    def move_sorted(self, ranges: Ranges, diff: int) -> None: ...
+
+
+class Command(abc.ABC):
+    name = ""
+
+    @abc.abstractmethod
+    def redo(self, editor: Editor) -> None: ...
+
+    @abc.abstractmethod
+    def undo(self, editor: Editor) -> None: ...
+
+    @abc.abstractmethod
+    def to_json(self) -> dict[str, Any]: ...
+
+
+@final
+class Load(Command):
+    name = "load"
+
+    def __init__(self, first: int, filenames: list[str]):
+        self.first = first
+        self.filenames = filenames
+
+    def _get_ids(self) -> list[int]:
+        return list(range(self.first, self.first + len(self.filenames)))
+
+    @override
+    def redo(self, editor: Editor) -> None:
+        editor.append_unsorted(
+            editor.create_items(self._get_ids(), self.filenames)
+        )
+
+    @override
+    def undo(self, editor: Editor) -> None:
+        editor.drop_items(editor.take_unsorted(self._get_ids()))
+
+    @override
+    def to_json(self) -> dict[str, Any]:
+        return {"first": self.first, "filenames": self.filenames}
+
+
+@final
+class Add(Command):
+    name = "add"
+
+    def __init__(self, ids: list[int], row: int):
+        self.ids = ids
+        self.row = row
+
+    @override
+    def redo(self, editor: Editor) -> None:
+        editor.insert_sorted(
+            [(self.row, self.row + len(self.ids) - 1)],
+            editor.take_unsorted(self.ids),
+        )
+
+    @override
+    def undo(self, editor: Editor) -> None:
+        editor.put_unsorted(
+            editor.take_sorted([(self.row, self.row + len(self.ids) - 1)])
+        )
+
+    @override
+    def to_json(self) -> dict[str, Any]:
+        return {"ids": self.ids, "row": self.row}
+
+
+@final
+class Remove(Command):
+    name = "remove"
+
+    def __init__(self, ranges: Ranges, ids: list[int]):
+        self.ranges = ranges
+        self.ids = ids
+
+    @override
+    def redo(self, editor: Editor) -> None:
+        editor.put_unsorted(editor.take_sorted(self.ranges))
+
+    @override
+    def undo(self, editor: Editor) -> None:
+        editor.insert_sorted(self.ranges, editor.take_unsorted(self.ids))
+
+    @override
+    def to_json(self) -> dict[str, Any]:
+        return {"ranges": self.ranges, "ids": self.ids}
+
+
+@final
+class Move(Command):
+    name = "move"
+
+    def __init__(self, ranges: Ranges, diff: int):
+        self.ranges = ranges
+        self.diff = diff
+
+    @override
+    def redo(self, editor: Editor) -> None:
+        editor.move_sorted(self.ranges, self.diff)
+
+    @override
+    def undo(self, editor: Editor) -> None:
+        editor.move_sorted(
+            [
+                (top + self.diff, bottom + self.diff)
+                for top, bottom in self.ranges
+            ],
+            -self.diff,
+        )
+
+    @override
+    def to_json(self) -> dict[str, Any]:
+        return {"ranges": self.ranges, "diff": self.diff}
+
+
+@final
+class Clear(Command):
+    name = "clear"
+
+    def __init__(
+        self,
+        unsorted: tuple[list[int], list[str]],
+        sorted: tuple[list[int], list[str]],
+    ):
+        self.unsorted = unsorted
+        self.sorted = sorted
+
+    @override
+    def redo(self, editor: Editor) -> None:
+        ids, _ = self.sorted
+        if ids:
+            editor.drop_items(editor.take_sorted([(0, len(ids) - 1)]))
+        ids, _ = self.unsorted
+        editor.drop_items(editor.take_unsorted(ids))
+
+    @override
+    def undo(self, editor: Editor) -> None:
+        editor.put_unsorted(editor.create_items(*self.unsorted))
+        ids, _ = self.sorted
+        if ids:
+            editor.insert_sorted(
+                [(0, len(ids) - 1)], editor.create_items(*self.sorted)
+            )
+
+    @override
+    def to_json(self) -> dict[str, Any]:
+        return {"unsorted": self.unsorted, "sorted": self.sorted}
+
+
+def _to_ranges(value: list[list[int]]) -> Ranges:
+    return [(top, bottom) for top, bottom in value]
+
+
+def from_json(data: dict[str, Any]) -> Command:
+    name = data["type"]
+    if name == "load":
+        return Load(data["first"], data["filenames"])
+    if name == "add":
+        return Add(data["ids"], data["row"])
+    if name == "remove":
+        return Remove(_to_ranges(data["ranges"]), data["ids"])
+    if name == "move":
+        return Move(_to_ranges(data["ranges"]), data["diff"])
+    if name == "clear":
+        return Clear(
+            (data["unsorted"][0], data["unsorted"][1]),
+            (data["sorted"][0], data["sorted"][1]),
+        )
+    raise ValueError("Unknown command: " + name)
+
+
+@final
+class History:
+    def __init__(self, log_file_name: str, checkpoint_interval: int):
+        self.log_file_name = log_file_name
+        self.checkpoint_interval = checkpoint_interval
+        self.undo_stack: list[Command] = []
+        self.redo_stack: list[Command] = []
+        self.sequence = 0
+        self.logged = 0
+
+    def can_undo(self) -> bool:
+        return len(self.undo_stack) != 0
+
+    def can_redo(self) -> bool:
+        return len(self.redo_stack) != 0
+
+    def needs_checkpoint(self) -> bool:
+        return self.logged >= self.checkpoint_interval
+
+    def _write(self, command: Command, action: str) -> None:
+        self.sequence += 1
+        self.logged += 1
+        data = dict(
+            command.to_json(),
+            type=command.name,
+            action=action,
+            sequence=self.sequence,
+        )
+        try:
+            with open(self.log_file_name, "a") as f:
+                _ = f.write(json.dumps(data) + "\n")
+        except Exception:
+            print("Failed to write history.", file=sys.stderr)
+            traceback.print_exc()
+
+    def _apply(self, editor: Editor, command: Command, action: str) -> None:
+        if action == "undo":
+            command.undo(editor)
+            if self.undo_stack:
+                _ = self.undo_stack.pop()
+            self.redo_stack.append(command)
+        else:
+            command.redo(editor)
+            if action == "redo":
+                if self.redo_stack:
+                    _ = self.redo_stack.pop()
+            else:
+                self.redo_stack.clear()
+            self.undo_stack.append(command)
+
+    def push(self, command: Command) -> None:
+        self.undo_stack.append(command)
+        self.redo_stack.clear()
+        self._write(command, "do")
+
+    def undo(self, editor: Editor) -> None:
+        command = self.undo_stack[-1]
+        self._apply(editor, command, "undo")
+        self._write(command, "undo")
+
+    def redo(self, editor: Editor) -> None:
+        command = self.redo_stack[-1]
+        self._apply(editor, command, "redo")
+        self._write(command, "redo")
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def checkpoint(self) -> None:
+        self.logged = 0
+        try:
+            with open(self.log_file_name, "w"):
+                pass
+        except Exception:
+            print("Failed to truncate history.", file=sys.stderr)
+            traceback.print_exc()
+
+    def replay(self, editor: Editor, sequence: int) -> None:
+        self.sequence = sequence
+        if not os.path.exists(self.log_file_name):
+            return
+        try:
+            with open(self.log_file_name) as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except Exception:
+            print("Failed to read history.", file=sys.stderr)
+            traceback.print_exc()
+            return
+
+        for data in entries:
+            if data.get("sequence", 0) <= sequence:
+                continue
+            self._apply(editor, from_json(data), data.get("action", "do"))
+            self.sequence = data["sequence"]
+            self.logged += 1
@@ -0,0 +1,241 @@
+import os
+
+_ = os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+import argparse
+import datetime
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Iterable, final
+
+import diskorder
+
+orders = ["scan", "inode", "disk"]
+
+files_per_directory = 1000
+
+
+def create_files(path: str, count: int, file_size: int, seed: int) -> None:
+    image = G.QImage(640, 480, G.QImage.Format.Format_RGB32)
+    image.fill(G.QColor("gray"))
+    template_name = os.path.join(path, "template.jpg")
+    _ = image.save(template_name)
+    with open(template_name, "rb") as f:
+        template = f.read()
+
+    # Create the files in random order, so that their order on the disk
+    # differs from the order of their names.
+    rng = random.Random(seed)
+    numbers = list(range(count))
+    rng.shuffle(numbers)
+    start = datetime.datetime(2020, 1, 1)
+    for i in numbers:
+        directory = os.path.join(
+            path, "tree", "dir{:04}".format(i // files_per_directory)
+        )
+        os.makedirs(directory, exist_ok=True)
+        date = start + datetime.timedelta(seconds=37 * i)
+        filename = os.path.join(
+            directory, date.strftime("IMG_%Y%m%d_%H%M%S.jpg")
+        )
+        # Data after the end of the image makes every file unique.
+        padding = max(0, file_size - len(template))
+        with open(filename, "wb") as f:
+            _ = f.write(template)
+            _ = f.write(rng.randbytes(padding))
+    os.sync()
+
+
+def get_files(path: str) -> list[str]:
+    result: list[str] = []
+    for directory, dirs, files in os.walk(path):
+        dirs.sort()
+        result.extend(os.path.join(directory, name) for name in sorted(files))
+    return result
+
+
+def evict(paths: list[str], drop_caches: bool) -> None:
+    os.sync()
+    if drop_caches:
+        try:
+            with open("/proc/sys/vm/drop_caches", "w") as f:
+                _ = f.write("3\n")
+            return
+        except OSError:
+            pass
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def get_order(name: str, paths: list[str]) -> Iterable[int]:
+    def check() -> None:
+        pass
+
+    if name == "inode":
+        return sorted(range(len(paths)), key=lambda i: os.stat(paths[i]).st_ino)
+    if name == "disk":
+        return diskorder.schedule(paths, check)
+    return range(len(paths))
+
+
+@final
+class Result:
+    def __init__(self, files: int, order: str, times: list[float]):
+        self.files = files
+        self.order = order
+        self.times = times
+
+    def get_best(self) -> float:
+        return min(self.times)
+
+    def get_throughput(self) -> float:
+        return self.files / self.get_best()
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "files": self.files,
+            "order": self.order,
+            "times": self.times,
+            "files_per_second": self.get_throughput(),
+        }
+
+
+def measure(
+    paths: list[str],
+    order: str,
+    read: Callable[[str], int],
+    repeat: int,
+    drop_caches: bool,
+) -> Result:
+    times: list[float] = []
+    for _ in range(repeat):
+        evict(paths, drop_caches)
+        start = time.perf_counter()
+        for i in get_order(order, paths):
+            _ = read(paths[i])
+        times.append(time.perf_counter() - start)
+    return Result(len(paths), order, times)
+
+
+def print_results(results: list[Result]) -> None:
+    print(
+        "{:>8} {:<8} {:>10} {:>12} {:>8}".format(
+            "files", "order", "best [s]", "files/s", "speedup"
+        )
+    )
+    baseline: dict[int, float] = {}
+    for result in results:
+        if result.order == orders[0]:
+            baseline[result.files] = result.get_best()
+        base = baseline.get(result.files, result.get_best())
+        print(
+            "{:>8} {:<8} {:>10.3f} {:>12.1f} {:>7.2f}x".format(
+                result.files,
+                result.order,
+                result.get_best(),
+                result.get_throughput(),
+                base / result.get_best(),
+            )
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure metadata read throughput in scan order and in "
+        "disk order with readahead hints, on a cold page cache."
+    )
+    _ = parser.add_argument("--files", type=int, nargs="+", default=[2000])
+    _ = parser.add_argument(
+        "--file-size",
+        type=int,
+        default=2**20,
+        help="Size of the generated files in bytes.",
+    )
+    _ = parser.add_argument("--repeat", type=int, default=3)
+    _ = parser.add_argument("--seed", type=int, default=0)
+    _ = parser.add_argument(
+        "--order", choices=orders, nargs="+", default=orders
+    )
+    _ = parser.add_argument(
+        "--drop-caches",
+        action="store_true",
+        help="Drop all caches between runs (needs root) instead of evicting "
+        "the files one by one.",
+    )
+    _ = parser.add_argument(
+        "--directory",
+        help="Measure the images of an existing directory, for example on an "
+        "archive disk or a card reader, instead of generated ones.",
+    )
+    _ = parser.add_argument(
+        "--work-dir",
+        help="Where to generate the files, it should be on the device to "
+        "measure.",
+    )
+    _ = parser.add_argument("--output", help="Write the results as JSON.")
+    args = parser.parse_args()
+
+    app = G.QGuiApplication(sys.argv[:1])
+    import main
+
+    results: list[Result] = []
+    if args.directory:
+        mime_db = C.QMimeDatabase()
+        paths = [
+            path
+            for path in get_files(args.directory)
+            if mime_db.mimeTypeForFile(path).inherits("image/jpeg")
+        ]
+        for order in args.order:
+            results.append(
+                measure(
+                    paths,
+                    order,
+                    main.read_timestamp,
+                    args.repeat,
+                    args.drop_caches,
+                )
+            )
+    else:
+        for count in args.files:
+            work_dir = tempfile.mkdtemp(dir=args.work_dir)
+            try:
+                create_files(work_dir, count, args.file_size, args.seed)
+                paths = get_files(os.path.join(work_dir, "tree"))
+                for order in args.order:
+                    results.append(
+                        measure(
+                            paths,
+                            order,
+                            main.read_timestamp,
+                            args.repeat,
+                            args.drop_caches,
+                        )
+                    )
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    del app
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"results": [result.to_json() for result in results]},
+                f,
+                indent=2,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,50 @@
+import array
+import bisect
+import concurrent.futures as futures
+import errno
+import functools
+import multiprocessing
 import sys
 import os
 import PyQt6.QtWidgets as W
 import PyQt6.QtGui as G
 import PyQt6.QtCore as C
+import PyQt6.sip as sip
 import exifread
 import shutil
 import traceback
 
 # import pprint
-from typing import Any, Callable, cast, final, override
+from typing import Any, Callable, Iterable, Iterator, cast, final, override
 
 import apply
 import chooser
 import config
+import copier
+import decoder
+import delegate
+import diskorder
+import export
 import helper
+import history
+import merge
+import preflight
+import search
 import task
-
-
-orientations: dict[int, G.QTransform] = {
-    2: G.QTransform(-1, 0, 0, 1, 0, 0),
-    3: G.QTransform(-1, 0, 0, -1, 0, 0),
-    4: G.QTransform(1, 0, 0, -1, 0, 0),
-    5: G.QTransform(0, 1, 1, 0, 0, 0),
-    6: G.QTransform(0, 1, -1, 0, 0, 0),
-    7: G.QTransform(0, -1, -1, 0, 0, 0),
-    8: G.QTransform(0, -1, 1, 0, 0, 0),
-}
+import thumbnails
+import timeline
+import workspace
 
 
 @final
 class Exif:
     def __init__(self, filename: str, **kwargs: Any):
-        with open(filename, "rb") as f:
-            self.data = exifread.process_file(f, **kwargs)
+        try:
+            with open(filename, "rb") as f:
+                self.data = exifread.process_file(f, **kwargs)
+        except OSError:
+            # A file that cannot be read has no metadata.
+            self.data = {}
 
     def get_exif_tag(self, name: str) -> Any:
         tag = self.data.get(name)
@@ -48,6 +60,37 @@ class Exif:
         return len(self.data) != 0
 
 
+def get_timestamp(
+    filename: str, exif: Exif, stat: os.stat_result | None
+) -> int:
+    timestamp: int | None = None
+    date = exif.get_exif_tag("EXIF DateTimeOriginal")
+    if date is not None:
+        timestamp = timeline.parse_exif_date(
+            date,
+            exif.get_exif_tag("EXIF SubSecTimeOriginal"),
+            exif.get_exif_tag("EXIF OffsetTimeOriginal"),
+        )
+    if timestamp is None:
+        timestamp = timeline.parse_filename(os.path.basename(filename))
+    if timestamp is None:
+        timestamp = (
+            timeline.from_mtime(stat.st_mtime)
+            if stat is not None
+            else timeline.missing
+        )
+    return timestamp
+
+
+def read_timestamp(filename: str) -> int:
+    try:
+        return get_timestamp(
+            filename, Exif(filename, details=False), os.stat(filename)
+        )
+    except OSError:
+        return timeline.missing
+
+
 picture_size_step = 10
 picture_load_step = picture_size_step * 2
 
@@ -59,42 +102,111 @@ class ModelItem(G.QStandardItem):
         filename: str,
         index: int,
         sort_function: "Callable[[ModelItem], Any]",
+        timestamps: timeline.Timestamps,
+        metadata: dict[str, Any] | None = None,
     ):
         self.sort_function = sort_function
         self.filename = filename
         self.__index = index
+        self.__timestamps = timestamps
         self.__thumbnail_inited = False
+        self.__hydrated = False
+        self.__has_exif = False
+        self.__orientation: int | None = None
+        self.__file_size = 0
+        self.__icon_width = 0
+        self.__icon_height = 0
+
+        if metadata is not None:
+            self.__has_exif = metadata["exif"]
+            self.__orientation = metadata["orientation"]
+            self.__file_size = metadata["size"]
+            timestamps.set(index, metadata["timestamp"])
+            self.__hydrated = True
+        else:
+            timestamps.set(index, timeline.missing)
 
-        exif = Exif(self.filename, details=False)
+        super(ModelItem, self).__init__(os.path.basename(filename))
 
-        self.__has_exif = exif.is_valid()
+    def is_hydrated(self) -> bool:
+        return self.__hydrated
 
-        if self.__has_exif:
-            self.orientation = exif.get_orientation("Image Orientation")
+    def hydrate(self) -> None:
+        if self.__hydrated:
+            return
+        self.__hydrated = True
 
-            date = exif.get_exif_tag("EXIF DateTimeOriginal")
-            self.date: str = date if date is not None else ""
-        else:
-            self.orientation = None
-            self.date = ""
+        exif = Exif(self.filename, details=False)
+        self.__has_exif = exif.is_valid()
 
-        super(ModelItem, self).__init__(os.path.basename(filename))
+        try:
+            stat: os.stat_result | None = os.stat(self.filename)
+        except OSError:
+            stat = None
+        self.__file_size = stat.st_size if stat is not None else 0
+
+        self.__orientation = (
+            exif.get_orientation("Image Orientation")
+            if self.__has_exif
+            else None
+        )
+        self.__timestamps.set(
+            self.__index, get_timestamp(self.filename, exif, stat)
+        )
+
+    def get_metadata(self) -> dict[str, Any] | None:
+        if not self.__hydrated:
+            return None
+        return {
+            "exif": self.__has_exif,
+            "orientation": self.__orientation,
+            "size": self.__file_size,
+            "timestamp": self.timestamp,
+        }
 
     def get_index(self) -> int:
         return self.__index
 
+    @property
+    def timestamp(self) -> int:
+        self.hydrate()
+        return self.__timestamps.get(self.__index)
+
+    @property
+    def orientation(self) -> int | None:
+        self.hydrate()
+        return self.__orientation
+
+    def get_file_size(self) -> int | None:
+        # Unlike the rest of the metadata, the size does not need the file to
+        # be parsed, and a fresh stat also finds files that are gone.
+        try:
+            self.__file_size = os.stat(self.filename).st_size
+        except OSError:
+            return None
+        return self.__file_size
+
     def resize(self, size: int) -> None:
         self._init_thumbnail()
 
-        actual_size: C.QSize | None = None
-        if self.icon() is not None:
-            actual_size = self.icon().actualSize(C.QSize(size, size))
-        if actual_size is None or (
-            actual_size.width() < size and actual_size.height() < size
-        ):
+        if self.needs_icon(size):
             self._create_icon(size)
 
+    def preview(self) -> None:
+        self._init_thumbnail()
+
+    def needs_icon(self, size: int) -> bool:
+        return self.__icon_width < size and self.__icon_height < size
+
+    def _set_pixmap(self, pixmap: G.QPixmap) -> None:
+        # Remember the size, so that checking the icon does not have to query
+        # the icon engine.
+        self.__icon_width = pixmap.width()
+        self.__icon_height = pixmap.height()
+        self.setIcon(G.QIcon(pixmap))
+
     def _init_thumbnail(self) -> None:
+        self.hydrate()
         if not self.__has_exif or self.__thumbnail_inited:
             return
 
@@ -114,22 +226,35 @@ class ModelItem(G.QStandardItem):
         self.__thumbnail_inited = True
 
     def _set_icon(self, image: G.QPixmap, orientation: int | None) -> None:
-        if orientation is not None:
-            transform = orientations.get(orientation)
-            if transform is not None:
-                image = image.transformed(transform)
-        self.setIcon(G.QIcon(image))
+        self._set_pixmap(thumbnails.orient(image, orientation))
 
-    def _create_icon(self, size: int) -> None:
-        result = G.QPixmap(self.filename)
-        if result.width() > size or result.height() > size:
-            result = result.scaled(
-                size + picture_load_step,
+    def request_icon(self, image_decoder: decoder.Decoder, size: int) -> None:
+        self._init_thumbnail()
+
+        if self.needs_icon(size):
+            image_decoder.request(
+                (self.__index, size),
+                self._receive_icon,
+                self.filename,
+                size,
                 size + picture_load_step,
-                C.Qt.AspectRatioMode.KeepAspectRatio,
-                C.Qt.TransformationMode.SmoothTransformation,
+                self.orientation,
+                config.config.get("shared_thumbnails", True),
             )
-        self._set_icon(result, self.orientation)
+
+    def _receive_icon(self, image: G.QImage) -> None:
+        if not sip.isdeleted(self):
+            self._set_pixmap(G.QPixmap.fromImage(image))
+
+    def _create_icon(self, size: int) -> None:
+        result = thumbnails.create(
+            self.filename,
+            size,
+            size + picture_load_step,
+            self.orientation,
+            config.config.get("shared_thumbnails", True),
+        )
+        self._set_pixmap(G.QPixmap.fromImage(result))
 
     @override
     def __lt__(self, other: G.QStandardItem) -> bool:
@@ -141,9 +266,10 @@ class ModelItem(G.QStandardItem):
 sort_functions: dict[str, Callable[[ModelItem], Any]] = {
     "index": lambda m: m.get_index(),
     "name": lambda m: (m.text(), m.get_index()),
-    "date": lambda m: (m.date, m.get_index()),
-    "date_name": lambda m: (m.date, m.text(), m.get_index()),
+    "date": lambda m: (m.timestamp, m.get_index()),
+    "date_name": lambda m: (m.timestamp, m.text(), m.get_index()),
 }
+metadata_sort_functions = {"date", "date_name"}
 
 
 @final
@@ -180,35 +306,104 @@ class MainWindow(W.QMainWindow):
         if config.config["maximized"]:
             self.setWindowState(C.Qt.WindowState.WindowMaximized)
         self.picture_size = config.config["picture_size"]
+        self.progressive: bool = config.config.get(
+            "progressive_thumbnails", False
+        )
 
         self.loaded_files: set[str] = set()
+        # Dates of the files found by the last merge scan of the target
+        # directory, keyed by path, modification time and size.
+        self.existing_timestamps: dict[tuple[str, int, int], int] = {}
 
         self.mime_db = C.QMimeDatabase()
         self.current_index = 0
+        self.timestamps = timeline.Timestamps()
+        # Set when items are created without metadata, so that loading does
+        # not have to check every item to know if there is any to hydrate.
+        self.hydration_pending = False
+        workspace.migrate(os.path.splitext(config.config_file_name)[0] + ".log")
+        self.workspace = workspace.get_current()
+        self.history = self._create_history()
+
+        G.QPixmapCache.setCacheLimit(
+            config.config.get("pixmap_cache_size", 65536)
+        )
 
         self.from_model = G.QStandardItemModel()
         self.from_list = W.QListView()
         self.from_list.setViewMode(W.QListView.ViewMode.IconMode)
         self.from_list.setMovement(W.QListView.Movement.Static)
         self.from_list.setResizeMode(W.QListView.ResizeMode.Adjust)
+        self._init_view(self.from_list)
         self.from_list.setSelectionMode(
             W.QAbstractItemView.SelectionMode.ExtendedSelection
         )
-        self.from_list.setModel(self.from_model)
-        sm = self.from_list.selectionModel()
-        assert sm is not None
-        _ = sm.selectionChanged.connect(  # type: ignore
-            lambda s, d: self.check_from_selection()
-        )
+        self._set_from_view_model(self.from_model)
         _ = self.from_list.doubleClicked.connect(  # type: ignore
-            lambda idx: self.open_file(self.from_model, idx)
+            lambda idx: self.open_file(
+                self.from_model, self._map_to_source(idx)
+            )
+        )
+
+        self.search_index: search.SearchIndex | None = None
+        for changed in (
+            self.from_model.rowsInserted,
+            self.from_model.rowsRemoved,
+            self.from_model.layoutChanged,
+            self.from_model.modelReset,
+        ):
+            _ = changed.connect(  # type: ignore
+                lambda *args: self._invalidate_search_index()
+            )
+        self.timeline_timer = C.QTimer(self)
+        self.timeline_timer.setSingleShot(True)
+        self.timeline_timer.setInterval(200)
+        _ = self.timeline_timer.timeout.connect(self.update_timeline)
+        self.filter_model = search.FilterModel(self.from_model)
+        self.filter_timer = C.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(0)
+        _ = self.filter_timer.timeout.connect(self.update_filter)
+        _ = self.filter_model.source_changed.connect(self.filter_timer.start)
+
+        filter_layout = W.QGridLayout()
+        self.filter_edit = W.QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter by file name, e.g. IMG_45*")
+        self.filter_edit.setClearButtonEnabled(True)
+        _ = self.filter_edit.textChanged.connect(
+            lambda _: self.update_filter()
+        )
+        filter_layout.addWidget(self.filter_edit, 0, 0, 1, 3)
+        self.add_matches_button = W.QToolButton()
+        self.add_matches_button.setText("Add matches")
+        _ = self.add_matches_button.clicked.connect(
+            lambda _: self.add_matches()
         )
+        self.add_matches_button.setEnabled(False)
+        filter_layout.addWidget(self.add_matches_button, 0, 3)
+        self.date_filter_check_box = W.QCheckBox("Date")
+        _ = self.date_filter_check_box.toggled.connect(
+            lambda _: self.update_filter()
+        )
+        filter_layout.addWidget(self.date_filter_check_box, 1, 0)
+        now = C.QDateTime.currentDateTime()
+        self.filter_start_edit = W.QDateTimeEdit(now.addDays(-1))
+        self.filter_end_edit = W.QDateTimeEdit(now)
+        filter_edits = (self.filter_start_edit, self.filter_end_edit)
+        for i, edit in enumerate(filter_edits):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+            _ = edit.dateTimeChanged.connect(lambda _: self.update_filter())
+            filter_layout.addWidget(edit, 1, i + 1)
+        self.timeline = timeline.TimelineWidget()
+        _ = self.timeline.range_selected.connect(self.select_date_range)
 
         self.to_model = G.QStandardItemModel()
         self.to_list = W.QListView()
         self.to_list.setViewMode(W.QListView.ViewMode.IconMode)
         self.to_list.setMovement(W.QListView.Movement.Static)
         self.to_list.setResizeMode(W.QListView.ResizeMode.Adjust)
+        self._init_view(self.to_list)
         self.to_list.setSelectionMode(
             W.QAbstractItemView.SelectionMode.ExtendedSelection
         )
@@ -260,8 +455,12 @@ class MainWindow(W.QMainWindow):
 
         splitter = W.QSplitter()
 
+        from_view_layout = W.QVBoxLayout()
+        from_view_layout.addLayout(filter_layout)
+        from_view_layout.addWidget(self.timeline)
+        from_view_layout.addWidget(self.from_list)
         from_layout = W.QHBoxLayout()
-        from_layout.addWidget(self.from_list)
+        from_layout.addLayout(from_view_layout)
         from_layout.addLayout(move_layout)
         from_widget = W.QWidget()
         from_widget.setLayout(from_layout)
@@ -306,6 +505,22 @@ class MainWindow(W.QMainWindow):
         assert clear_action is not None
         clear_action.setShortcut("Alt+C")
         helper.set_tooltip(clear_action)
+        undo_action = toolbar.addAction(
+            config.get_icon("undo"), "Undo", self.undo
+        )
+        assert undo_action is not None
+        undo_action.setShortcut("Ctrl+Z")
+        undo_action.setEnabled(False)
+        helper.set_tooltip(undo_action)
+        self.undo_action = undo_action
+        redo_action = toolbar.addAction(
+            config.get_icon("redo"), "Redo", self.redo
+        )
+        assert redo_action is not None
+        redo_action.setShortcut("Ctrl+Shift+Z")
+        redo_action.setEnabled(False)
+        helper.set_tooltip(redo_action)
+        self.redo_action = redo_action
         _ = toolbar.addSeparator()
         add_action = toolbar.addAction(
             config.get_icon("folder"),
@@ -343,6 +558,36 @@ class MainWindow(W.QMainWindow):
         assert zoom_out_action is not None
         zoom_out_action.setShortcut("Ctrl+-")
         helper.set_tooltip(zoom_out_action)
+        progressive_action = toolbar.addAction(
+            config.get_icon("image"), "Progressive loading"
+        )
+        assert progressive_action is not None
+        progressive_action.setCheckable(True)
+        progressive_action.setChecked(self.progressive)
+        progressive_action.setShortcut("Alt+P")
+        helper.set_tooltip(progressive_action)
+        _ = progressive_action.toggled.connect(self.set_progressive)
+        _ = toolbar.addSeparator()
+        self.workspace_combo = W.QComboBox()
+        self.workspace_combo.addItems(workspace.get_names())
+        self.workspace_combo.setCurrentText(self.workspace)
+        self.workspace_combo.setToolTip("Workspace")
+        _ = self.workspace_combo.textActivated.connect(self.switch_workspace)
+        _ = toolbar.addWidget(self.workspace_combo)
+        new_workspace_action = toolbar.addAction(
+            config.get_icon("folder-plus"), "New workspace", self.new_workspace
+        )
+        assert new_workspace_action is not None
+        new_workspace_action.setShortcut("Alt+N")
+        helper.set_tooltip(new_workspace_action)
+        delete_workspace_action = toolbar.addAction(
+            config.get_icon("delete"),
+            "Delete workspace",
+            self.delete_workspace,
+        )
+        assert delete_workspace_action is not None
+        delete_workspace_action.setShortcut("Alt+D")
+        helper.set_tooltip(delete_workspace_action)
         _ = toolbar.addSeparator()
         aa = toolbar.addAction(config.get_icon("floppy"), "Apply", self.apply)
         assert aa is not None
@@ -352,7 +597,29 @@ class MainWindow(W.QMainWindow):
         helper.set_tooltip(aa)
         self.apply_action = aa
 
+        decode_processes: int = config.config.get("decode_processes", 0)
+        self.decoder = (
+            decoder.Decoder(self, decode_processes)
+            if decode_processes > 0
+            else None
+        )
         self.load_pictures_task = task.Task(self.load_pictures)
+        self.upgrade_pictures_task = task.Task(self.upgrade_pictures)
+        self.upgrade_timer = C.QTimer(self)
+        self.upgrade_timer.setSingleShot(True)
+        self.upgrade_timer.setInterval(
+            config.config.get("progressive_delay", 300)
+        )
+        _ = self.upgrade_timer.timeout.connect(self.upgrade_pictures_task.run)
+        for view in (self.from_list, self.to_list):
+            scroll_bar = view.verticalScrollBar()
+            assert scroll_bar is not None
+            _ = scroll_bar.valueChanged.connect(
+                lambda _: self._schedule_upgrade()
+            )
+            _ = scroll_bar.rangeChanged.connect(
+                lambda _min, _max: self._schedule_upgrade()
+            )
         C.QCoreApplication.postEvent(self, InitEvent(paths))
 
     def clear(self) -> None:
@@ -380,21 +647,29 @@ class MainWindow(W.QMainWindow):
             return
 
         if result == W.QMessageBox.ButtonRole.YesRole:
+            command = history.Clear(
+                self._get_item_list(self.from_model), ([], [])
+            )
             for row in range(self.from_model.rowCount()):
                 self.loaded_files.remove(
                     cast(ModelItem, self.from_model.item(row)).filename
                 )
             self.from_model.clear()
         elif result == W.QMessageBox.ButtonRole.AcceptRole:
+            command = history.Clear(
+                self._get_item_list(self.from_model),
+                self._get_item_list(self.to_model),
+            )
             self.from_model.clear()
             self.to_model.clear()
             self.loaded_files.clear()
-            self.current_index = 0
             self.check_to_selection()
             self.check_to_items()
+        else:
+            return
 
         self.check_from_selection()
-        self.save_items()
+        self._record(command)
 
     @override
     def resizeEvent(self, event: G.QResizeEvent | None) -> None:
@@ -405,6 +680,7 @@ class MainWindow(W.QMainWindow):
             config.config["width"] = self.width()
             config.config["height"] = self.height()
         config.save_config()
+        self._schedule_upgrade()
 
     @override
     def closeEvent(self, event: G.QCloseEvent | None) -> None:
@@ -416,7 +692,12 @@ class MainWindow(W.QMainWindow):
             if result != W.QMessageBox.StandardButton.Yes:
                 event.ignore()
                 return
+        self.save_items()
         self.load_pictures_task.interrupt()
+        self.upgrade_pictures_task.interrupt()
+        self.upgrade_timer.stop()
+        if self.decoder is not None:
+            self.decoder.shutdown()
         super(MainWindow, self).closeEvent(event)
 
     def resize_pictures(self, size: int) -> None:
@@ -425,34 +706,281 @@ class MainWindow(W.QMainWindow):
         config.save_config()
         self.load_pictures_task.run()
 
+    def _init_view(self, view: W.QListView) -> None:
+        # Every cell has the same size, so the view can lay out the items
+        # without asking for each size hint, in batches to stay responsive.
+        view.setItemDelegate(delegate.ThumbnailDelegate(view))
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(W.QListView.LayoutMode.Batched)
+        view.setBatchSize(1000)
+        view.installEventFilter(self)
+
     def _set_view_size(self, view: W.QListView) -> None:
-        separation = 10
-        font_metrics = G.QFontMetrics(view.font())
+        view_delegate = cast(delegate.ThumbnailDelegate, view.itemDelegate())
+        view_delegate.set_picture_size(self.picture_size, view.font())
+        view_delegate.elide_mode = view.textElideMode()
         view.setIconSize(C.QSize(self.picture_size, self.picture_size))
-        view.setGridSize(
-            C.QSize(
-                self.picture_size + separation,
-                self.picture_size + separation + font_metrics.height(),
+        view.setGridSize(view_delegate.get_grid_size())
+        view.setMinimumWidth(self.picture_size + delegate.separation * 2)
+
+    @override
+    def eventFilter(
+        self, watched: C.QObject | None, event: C.QEvent | None
+    ) -> bool:
+        assert event is not None
+        # The cells and the cached texts are sized for the font.
+        if event.type() == C.QEvent.Type.FontChange and isinstance(
+            watched, W.QListView
+        ):
+            self._set_view_size(watched)
+        return super(MainWindow, self).eventFilter(watched, event)
+
+    def set_progressive(self, progressive: bool) -> None:
+        self.progressive = progressive
+        config.config["progressive_thumbnails"] = progressive
+        config.save_config()
+        self.load_pictures_task.run()
+
+    def _get_visible_rows(self, view: W.QListView) -> range:
+        model = view.model()
+        viewport = view.viewport()
+        assert model is not None
+        assert viewport is not None
+        height = viewport.height()
+        rows = range(model.rowCount())
+
+        # Batched layout places the rows in order, the ones that are not laid
+        # out yet have no rectangle and count as below the viewport.
+        def is_after_top(row: int) -> bool:
+            rect = view.visualRect(model.index(row, 0))
+            return not rect.isValid() or rect.bottom() >= 0
+
+        def is_after_bottom(row: int) -> bool:
+            rect = view.visualRect(model.index(row, 0))
+            return not rect.isValid() or rect.top() > height
+
+        first = bisect.bisect_left(rows, True, key=is_after_top)
+        last = bisect.bisect_left(rows, True, lo=first, key=is_after_bottom)
+        return range(first, last)
+
+    def _get_visible_items(self) -> list[ModelItem]:
+        return [
+            self._get_view_item(view, row)
+            for view in (self.from_list, self.to_list)
+            for row in self._get_visible_rows(view)
+        ]
+
+    def _map_to_source(self, index: C.QModelIndex) -> C.QModelIndex:
+        model = index.model()
+        if isinstance(model, C.QAbstractProxyModel):
+            return model.mapToSource(index)
+        return index
+
+    def _get_view_item(self, view: W.QListView, row: int) -> ModelItem:
+        model = view.model()
+        assert model is not None
+        index = self._map_to_source(model.index(row, 0))
+        source_model = cast(G.QStandardItemModel, index.model())
+        return cast(ModelItem, source_model.itemFromIndex(index))
+
+    def _set_from_view_model(self, model: C.QAbstractItemModel) -> None:
+        if self.from_list.model() is model:
+            return
+        old_sm = self.from_list.selectionModel()
+        self.from_list.setModel(model)
+        if old_sm is not None:
+            old_sm.deleteLater()
+        sm = self.from_list.selectionModel()
+        assert sm is not None
+        _ = sm.selectionChanged.connect(  # type: ignore
+            lambda s, d: self.check_from_selection()
+        )
+
+    def _invalidate_search_index(self) -> None:
+        self.search_index = None
+        self.timeline_timer.start()
+
+    def _get_search_index(self) -> search.SearchIndex:
+        if self.search_index is None:
+            items = [
+                cast(ModelItem, self.from_model.item(row))
+                for row in range(self.from_model.rowCount())
+            ]
+            self.search_index = search.SearchIndex(
+                [item.text() for item in items],
+                array.array(
+                    "q",
+                    (self.timestamps.get(item.get_index()) for item in items),
+                ),
+            )
+        return self.search_index
+
+    def update_filter(self) -> None:
+        text = self.filter_edit.text()
+        use_date = self.date_filter_check_box.isChecked()
+        self.add_matches_button.setEnabled(bool(text) or use_date)
+        if not text and not use_date:
+            self._set_from_view_model(self.from_model)
+            self.check_from_selection()
+            return
+
+        index = self._get_search_index()
+        start = timeline.from_datetime(self.filter_start_edit.dateTime())
+        end = timeline.from_datetime(self.filter_end_edit.dateTime())
+        rows: Iterable[int] | None = None
+        if text:
+            rows = index.find_names(text)
+        if use_date:
+            date_rows = index.find_dates(start, end)
+            rows = (
+                date_rows
+                if rows is None
+                else set(date_rows).intersection(rows)
             )
+        assert rows is not None
+
+        matches_name = search.get_name_matcher(text) if text else None
+
+        def accepts(row: int) -> bool:
+            item = cast(ModelItem, self.from_model.item(row))
+            if matches_name is not None and not matches_name(item.text()):
+                return False
+            if use_date:
+                timestamp = self.timestamps.get(item.get_index())
+                return start <= timestamp <= end
+            return True
+
+        self.filter_model.set_rows(sorted(rows), accepts)
+        self._set_from_view_model(self.filter_model)
+        self.check_from_selection()
+
+    def update_timeline(self) -> None:
+        self.timeline.set_timestamps(self._get_search_index().timestamps)
+
+    def select_date_range(self, start: int, end: int) -> None:
+        ranges = timeline.get_ranges(
+            self._get_search_index().timestamps, start, end
         )
-        view.setMinimumWidth(self.picture_size + separation * 2)
+        selection = C.QItemSelection()
+        for top, bottom in ranges:
+            selection.select(
+                self.from_model.index(top, 0), self.from_model.index(bottom, 0)
+            )
+        view_model = self.from_list.model()
+        if isinstance(view_model, C.QAbstractProxyModel):
+            selection = view_model.mapSelectionFromSource(selection)
+        sm = self.from_list.selectionModel()
+        assert sm is not None
+        sm.select(selection, C.QItemSelectionModel.SelectionFlag.ClearAndSelect)
+        if not selection.isEmpty() and view_model is not None:
+            first = min(selection[i].top() for i in range(len(selection)))
+            self.from_list.scrollTo(
+                view_model.index(first, 0),
+                W.QAbstractItemView.ScrollHint.PositionAtTop,
+            )
+
+    def add_matches(self) -> None:
+        if self.from_list.model() is self.filter_model:
+            self.add_items(self.filter_model.get_ranges())
+
+    def _schedule_upgrade(self) -> None:
+        if not self.progressive:
+            return
+        self.upgrade_pictures_task.interrupt()
+        if self.decoder is not None:
+            self.decoder.cancel()
+        for item in self._get_visible_items():
+            item.preview()
+        self.upgrade_timer.start()
+
+    def upgrade_pictures(self, check: Callable[[], None]) -> None:
+        hydrated = False
+        try:
+            for item in self._get_visible_items():
+                if item.needs_icon(self.picture_size):
+                    hydrated = hydrated or not item.is_hydrated()
+                    self._resize_item(item)
+                    check()
+        finally:
+            if hydrated:
+                self._invalidate_search_index()
+
+    def _resize_item(self, item: ModelItem) -> None:
+        if self.decoder is not None:
+            item.request_icon(self.decoder, self.picture_size)
+        else:
+            item.resize(self.picture_size)
 
     def load_pictures(self, check: Callable[[], None]) -> None:
         self._set_view_size(self.from_list)
         self._set_view_size(self.to_list)
 
+        if self.decoder is not None:
+            self.decoder.cancel()
+
+        hydrating = self.hydration_pending
+        self.hydration_pending = False
+        try:
+            if self.progressive:
+                self._schedule_upgrade()
+            else:
+                self._load_all_pictures(check)
+            if hydrating:
+                self._hydrate_items(check)
+        except BaseException:
+            self.hydration_pending = self.hydration_pending or hydrating
+            raise
+        finally:
+            # Also when interrupted, as some of the items may have been
+            # hydrated since the index was built.
+            if hydrating:
+                self._invalidate_search_index()
+
+    def _load_all_pictures(self, check: Callable[[], None]) -> None:
         with OverrideCursor(G.QCursor(C.Qt.CursorShape.BusyCursor)):
-            for i in range(self.from_model.rowCount()):
-                cast(ModelItem, self.from_model.item(i, 0)).resize(
-                    self.picture_size
-                )
+            visible = self._get_visible_items()
+            for item in visible:
+                self._resize_item(item)
                 check()
-            for i in range(self.to_model.rowCount()):
-                cast(ModelItem, self.to_model.item(i, 0)).resize(
-                    self.picture_size
-                )
+            visible_ids = {id(item) for item in visible}
+            items = [
+                item
+                for item in self._get_all_items()
+                if id(item) not in visible_ids
+                and item.needs_icon(self.picture_size)
+            ]
+            for item in self._in_disk_order(
+                items, check, diskorder.picture_size
+            ):
+                self._resize_item(item)
                 check()
 
+    def _hydrate_items(
+        self, check: Callable[[], None], items: list[ModelItem] | None = None
+    ) -> None:
+        # Visible items are hydrated on demand, fill in the rest in the
+        # background so that searching and the timeline see every date.
+        if items is None:
+            items = self._get_all_items()
+        items = [item for item in items if not item.is_hydrated()]
+        for item in self._in_disk_order(items, check, diskorder.header_size):
+            item.hydrate()
+            check()
+
+    def _get_all_items(self) -> list[ModelItem]:
+        return [
+            cast(ModelItem, model.item(row, 0))
+            for model in (self.from_model, self.to_model)
+            for row in range(model.rowCount())
+        ]
+
+    def _in_disk_order(
+        self, items: list[ModelItem], check: Callable[[], None], length: int
+    ) -> Iterator[ModelItem]:
+        filenames = [item.filename for item in items]
+        for i in diskorder.schedule(filenames, check, length):
+            yield items[i]
+
     @override
     def event(self, event: C.QEvent | None) -> bool:
         assert event is not None
@@ -460,49 +988,168 @@ class MainWindow(W.QMainWindow):
             init_event = cast(InitEvent, event)
             self.init(init_event)
             return True
+        if (
+            cast(int, event.type()) == decoder.DecodedEvent.EventType
+            and self.decoder is not None
+        ):
+            self.decoder.receive(cast(decoder.DecodedEvent, event))
+            return True
         return super(MainWindow, self).event(event)
 
-    def _create_model_item(self, filename: str, index: int) -> ModelItem:
-        def sort_function(item: ModelItem) -> Any:
-            return sort_functions[self.current_sort_function](item)
+    def _sort_function(self, item: ModelItem) -> Any:
+        return sort_functions[self.current_sort_function](item)
 
-        return ModelItem(filename, index, sort_function)
+    def _create_model_item(
+        self, filename: str, index: int, metadata: Any = None
+    ) -> ModelItem:
+        if metadata is None:
+            self.hydration_pending = True
+        return ModelItem(
+            filename, index, self._sort_function, self.timestamps, metadata
+        )
 
-    def init(self, init_event: InitEvent) -> None:
-        def add_item(model: G.QStandardItemModel, item: Any) -> None:
-            filename = item["filename"]
-            index = item["index"]
-            model.appendRow([self._create_model_item(filename, index)])
-            self.current_index = max(self.current_index, index + 1)
-            self.loaded_files.add(filename)
+    def _create_history(self) -> history.History:
+        return history.History(
+            workspace.get_file_name(self.workspace, ".log"),
+            config.config.get("checkpoint_interval", 100),
+        )
+
+    def _restore_items(self, items: Any) -> None:
+        for model, key in ((self.from_model, "from"), (self.to_model, "to")):
+            model.clear()
+            model_items: list[G.QStandardItem] = []
+            for item in items.get(key, []):
+                filename = item["filename"]
+                index = item["index"]
+                model_items.append(
+                    self._create_model_item(
+                        filename, index, item.get("metadata")
+                    )
+                )
+                self.current_index = max(self.current_index, index + 1)
+                self.loaded_files.add(filename)
+            # Filling the empty model in one call is much faster than
+            # setting the items one by one.
+            model.appendColumn(model_items)
+        self.history.replay(self, items.get("sequence", 0))
 
+    def init(self, init_event: InitEvent) -> None:
         if init_event.paths:
+            self.history.checkpoint()
             for path in init_event.paths:
                 self._add_dir(path, recursive=True)
+            self.history.clear()
+            self._sort_from_model()
             self.save_items()
-        elif "items" in config.config:
-            items = config.config["items"]
-            for item in items["from"]:
-                add_item(self.from_model, item)
-            for item in items["to"]:
-                add_item(self.to_model, item)
-            self.check_to_items()
         else:
-            self.load_pictures_task.run()
+            self._restore_items(workspace.load(self.workspace).get("items", {}))
+            self.check_to_items()
+            self._check_history()
+        self.load_pictures_task.run()
+
+    def switch_workspace(self, name: str, save: bool = True) -> None:
+        if name == self.workspace:
             return
+        if save:
+            self.save_items()
+        self.load_pictures_task.interrupt()
+        self.upgrade_pictures_task.interrupt()
+        if self.decoder is not None:
+            self.decoder.cancel()
+        self.loaded_files.clear()
+        self.current_index = 0
+        self.timestamps = timeline.Timestamps()
+
+        self.workspace = name
+        config.config["workspace"] = name
+        self.workspace_combo.setCurrentText(name)
+        data = workspace.load(name)
+        workspace.set_settings(data.get("settings", {}))
+        self.history = self._create_history()
+        self._restore_items(data.get("items", {}))
+        config.save_config()
 
-        self.from_model.sort(0)
+        self.check_from_selection()
+        self.check_to_selection()
+        self.check_to_items()
+        self._check_history()
         self.load_pictures_task.run()
 
-    def _get_selected_items(self, view: W.QListView) -> list[int]:
+    def new_workspace(self) -> None:
+        name, ok = W.QInputDialog.getText(
+            self, "New workspace", "Workspace name:"
+        )
+        name = name.strip()
+        if not ok or not name:
+            return
+        names = workspace.get_names()
+        if name not in names:
+            names.append(name)
+            self.workspace_combo.addItem(name)
+        self.switch_workspace(name)
+
+    def delete_workspace(self) -> None:
+        names = workspace.get_names()
+        if len(names) < 2:
+            return
+        result = W.QMessageBox.question(
+            self,
+            "Delete workspace",
+            "Do you really want to delete the workspace {}? Files on the "
+            "disk will not be deleted.".format(self.workspace),
+        )
+        if result != W.QMessageBox.StandardButton.Yes:
+            return
+        name = self.workspace
+        names.remove(name)
+        self.switch_workspace(names[0], save=False)
+        self.workspace_combo.removeItem(self.workspace_combo.findText(name))
+        workspace.remove(name)
+        config.save_config()
+
+    def _get_selected_ranges(self, view: W.QListView) -> list[tuple[int, int]]:
         model = view.selectionModel()
         assert model is not None
-        return [index.row() for index in model.selectedIndexes()]
+        selection = model.selection()
+        view_model = view.model()
+        if isinstance(view_model, C.QAbstractProxyModel):
+            selection = view_model.mapSelectionToSource(selection)
+        return self._get_ranges(selection)
+
+    def _get_ranges(self, selection: C.QItemSelection) -> list[tuple[int, int]]:
+        result: list[tuple[int, int]] = []
+        for top, bottom in sorted(
+            (selection[i].top(), selection[i].bottom())
+            for i in range(len(selection))
+        ):
+            if result and top <= result[-1][1] + 1:
+                result[-1] = (result[-1][0], max(result[-1][1], bottom))
+            else:
+                result.append((top, bottom))
+        return result
+
+    def _get_view_ranges(
+        self, view: W.QListView, ranges: list[tuple[int, int]]
+    ) -> list[tuple[int, int]]:
+        view_model = view.model()
+        if not isinstance(view_model, C.QAbstractProxyModel):
+            return ranges
+        source_model = view_model.sourceModel()
+        assert source_model is not None
+        selection = C.QItemSelection()
+        for top, bottom in ranges:
+            selection.select(
+                source_model.index(top, 0), source_model.index(bottom, 0)
+            )
+        return self._get_ranges(view_model.mapSelectionFromSource(selection))
 
-    def _select_next(self, view: W.QListView, sorted_rows: list[int]) -> None:
-        if not sorted_rows:
+    def _select_next(
+        self, view: W.QListView, ranges: list[tuple[int, int]]
+    ) -> None:
+        if not ranges:
             return
-        next_row = sorted_rows[0] - len(sorted_rows) + 1
+        count = sum(bottom - top + 1 for top, bottom in ranges)
+        next_row = ranges[-1][1] - count + 1
         model = view.model()
         assert model is not None
         row_count = model.rowCount()
@@ -510,95 +1157,249 @@ class MainWindow(W.QMainWindow):
             next_row = row_count - 1
         view.setCurrentIndex(model.index(next_row, 0))
 
-    def add_items(self) -> None:
-        rows = self._get_selected_items(self.from_list)
-        to_rows = self._get_selected_items(self.to_list)
-        for row in rows:
-            item = self.from_model.takeItem(row, 0)
-            if to_rows:
-                self.to_model.insertRow(to_rows[0], item)
-            else:
-                self.to_model.appendRow(item)
-        rows.sort(reverse=True)
-        for row in rows:
-            _ = self.from_model.removeRow(row)
-        self._select_next(self.from_list, rows)
+    def _take_ranges(
+        self, model: G.QStandardItemModel, ranges: list[tuple[int, int]]
+    ) -> list[G.QStandardItem]:
+        chunks = [
+            self._take_items(model, top, bottom + 1)
+            for top, bottom in reversed(ranges)
+        ]
+        return [item for chunk in reversed(chunks) for item in chunk]
+
+    def _insert_items(
+        self,
+        model: G.QStandardItemModel,
+        row: int,
+        items: list[G.QStandardItem],
+    ) -> None:
+        # Setting the items one by one would change the layout for each, insert
+        # them all with a single signal.
+        root = model.invisibleRootItem()
+        assert root is not None
+        root.insertRows(row, items)
+
+    def add_items(self, ranges: list[tuple[int, int]] | None = None) -> None:
+        if ranges is None:
+            ranges = self._get_selected_ranges(self.from_list)
+        if not ranges:
+            return
+        to_ranges = self._get_selected_ranges(self.to_list)
+        row = to_ranges[0][0] if to_ranges else self.to_model.rowCount()
+        view_ranges = self._get_view_ranges(self.from_list, ranges)
+        items = self._take_ranges(self.from_model, ranges)
+        self._insert_items(self.to_model, row, items)
+        self._select_next(self.from_list, view_ranges)
         self.check_from_selection()
         self.check_to_selection()
         self.check_to_items()
-        self.save_items()
+        self._record(history.Add(self._get_ids(items), row))
         self.load_pictures_task.run()
 
     def remove_items(self) -> None:
-        rows = self._get_selected_items(self.to_list)
-        rows.sort(reverse=True)
-        for row in rows:
-            item = self.to_model.takeItem(row, 0)
-            _ = self.to_model.removeRow(row)
-            self.from_model.appendRow(item)
-        self._select_next(self.to_list, rows)
-        self.from_model.sort(0)
+        ranges = self._get_selected_ranges(self.to_list)
+        if not ranges:
+            return
+        view_ranges = self._get_view_ranges(self.to_list, ranges)
+        items = self._take_ranges(self.to_model, ranges)
+        self.put_unsorted(items)
+        self._select_next(self.to_list, view_ranges)
         self.check_from_selection()
         self.check_to_selection()
         self.check_to_items()
-        self.save_items()
+        self._record(history.Remove(ranges, self._get_ids(items)))
+        self.load_pictures_task.run()
+
+    def undo(self) -> None:
+        if self.history.can_undo():
+            self._clear_selections()
+            self.history.undo(self)
+            self._after_history_change()
+
+    def redo(self) -> None:
+        if self.history.can_redo():
+            self._clear_selections()
+            self.history.redo(self)
+            self._after_history_change()
+
+    def _clear_selections(self) -> None:
+        # The commands take and insert rows by position, a selection left over
+        # from before would cover rows that are taken away under it.
+        for view in (self.from_list, self.to_list):
+            sm = view.selectionModel()
+            assert sm is not None
+            sm.clear()
+
+    def _after_history_change(self) -> None:
+        self.check_from_selection()
+        self.check_to_selection()
+        self.check_to_items()
+        self._check_history()
+        if self.history.needs_checkpoint():
+            self.save_items()
         self.load_pictures_task.run()
 
+    def _check_history(self) -> None:
+        self.undo_action.setEnabled(self.history.can_undo())
+        self.redo_action.setEnabled(self.history.can_redo())
+
+    def _record(self, command: history.Command) -> None:
+        self.history.push(command)
+        if self.history.needs_checkpoint():
+            self.save_items()
+        self._check_history()
+
+    def _get_ids(self, items: list[G.QStandardItem]) -> list[int]:
+        return [cast(ModelItem, item).get_index() for item in items]
+
+    def _get_item_list(
+        self, model: G.QStandardItemModel
+    ) -> tuple[list[int], list[str]]:
+        items = [
+            cast(ModelItem, model.item(row)) for row in range(model.rowCount())
+        ]
+        return (
+            [item.get_index() for item in items],
+            [item.filename for item in items],
+        )
+
+    def create_items(
+        self, ids: list[int], filenames: list[str]
+    ) -> list[G.QStandardItem]:
+        result: list[G.QStandardItem] = []
+        for index, filename in zip(ids, filenames):
+            result.append(self._create_model_item(filename, index))
+            self.current_index = max(self.current_index, index + 1)
+            self.loaded_files.add(filename)
+        return result
+
+    def drop_items(self, items: list[G.QStandardItem]) -> None:
+        for item in items:
+            self.loaded_files.discard(cast(ModelItem, item).filename)
+
+    def take_unsorted(self, ids: list[int]) -> list[G.QStandardItem]:
+        wanted = set(ids)
+        ranges: list[tuple[int, int]] = []
+        for row in range(self.from_model.rowCount()):
+            item = cast(ModelItem, self.from_model.item(row))
+            if item.get_index() not in wanted:
+                continue
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1] = (ranges[-1][0], row)
+            else:
+                ranges.append((row, row))
+        items = {
+            cast(ModelItem, item).get_index(): item
+            for item in self._take_ranges(self.from_model, ranges)
+        }
+        return [items[index] for index in ids]
+
+    def append_unsorted(self, items: list[G.QStandardItem]) -> None:
+        self._insert_items(self.from_model, self.from_model.rowCount(), items)
+
+    def put_unsorted(self, items: list[G.QStandardItem]) -> None:
+        self.append_unsorted(items)
+        self._sort_from_model()
+
+    def take_sorted(
+        self, ranges: list[tuple[int, int]]
+    ) -> list[G.QStandardItem]:
+        return self._take_ranges(self.to_model, ranges)
+
+    def insert_sorted(
+        self, ranges: list[tuple[int, int]], items: list[G.QStandardItem]
+    ) -> None:
+        position = 0
+        for top, bottom in ranges:
+            count = bottom - top + 1
+            self._insert_items(
+                self.to_model, top, items[position : position + count]
+            )
+            position += count
+
+    def move_sorted(self, ranges: list[tuple[int, int]], diff: int) -> None:
+        self._move(ranges, diff)
+
+    def _sort_from_model(self) -> None:
+        # Sorting by date needs the metadata of every item, read it in disk
+        # order up front instead of one file at a time from the comparisons.
+        if (
+            self.current_sort_function in metadata_sort_functions
+            and self.hydration_pending
+        ):
+            items = [
+                cast(ModelItem, self.from_model.item(row))
+                for row in range(self.from_model.rowCount())
+            ]
+            with OverrideCursor(G.QCursor(C.Qt.CursorShape.BusyCursor)):
+                self._hydrate_items(lambda: None, items)
+            self._invalidate_search_index()
+        self.from_model.sort(0)
+
     def set_sort(self, name: str) -> None:
         self.current_sort_function = name
-        self.from_model.sort(0)
+        self._sort_from_model()
         config.config["sort_function"] = name
         config.save_config()
         self.load_pictures_task.run()
 
-    def _take_to_items(self, first: int, last: int) -> list[G.QStandardItem]:
+    def _take_items(
+        self, model: G.QStandardItemModel, first: int, last: int
+    ) -> list[G.QStandardItem]:
         def func(row: int) -> G.QStandardItem:
-            res = self.to_model.takeItem(row, 0)
+            res = model.takeItem(row, 0)
             assert res is not None
             return res
 
         result = [func(row) for row in range(first, last)]
-        _ = self.to_model.removeRows(first, last - first)
+        _ = model.removeRows(first, last - first)
         return result
 
-    def _move(self, rows: list[int], diff: int) -> None:
-        for row in rows:
-            item = self.to_model.takeItem(row, 0)
-            _ = self.to_model.removeRow(row)
-            self.to_model.insertRow(row + diff, item)
+    def _move(self, ranges: list[tuple[int, int]], diff: int) -> None:
+        for top, bottom in ranges if diff < 0 else reversed(ranges):
+            if diff < 0:
+                self.to_model.insertRow(bottom, self.to_model.takeRow(top - 1))
+            else:
+                self.to_model.insertRow(top, self.to_model.takeRow(bottom + 1))
         selection = C.QItemSelection()
-        for row in rows:
-            index = self.to_model.index(row + diff, 0)
-            selection.select(index, index)
-            self.to_list.scrollTo(index)
+        for top, bottom in ranges:
+            selection.select(
+                self.to_model.index(top + diff, 0),
+                self.to_model.index(bottom + diff, 0),
+            )
+        if ranges:
+            top, bottom = ranges[0] if diff < 0 else ranges[-1]
+            self.to_list.scrollTo(
+                self.to_model.index((top if diff < 0 else bottom) + diff, 0)
+            )
 
         sm = self.to_list.selectionModel()
         assert sm is not None
         sm.select(selection, C.QItemSelectionModel.SelectionFlag.ClearAndSelect)
+        self.check_to_selection()
         self.load_pictures_task.run()
 
     def move_up(self) -> None:
-        selection = self._get_selected_items(self.to_list)
-        selection.sort()
-        self._move(selection, -1)
-        self.save_items()
+        ranges = self._get_selected_ranges(self.to_list)
+        if ranges and ranges[0][0] != 0:
+            self._move(ranges, -1)
+            self._record(history.Move(ranges, -1))
 
     def move_down(self) -> None:
-        selection = self._get_selected_items(self.to_list)
-        selection.sort(reverse=True)
-        self._move(selection, 1)
-        self.save_items()
+        ranges = self._get_selected_ranges(self.to_list)
+        if ranges and ranges[-1][1] != self.to_model.rowCount() - 1:
+            self._move(ranges, 1)
+            self._record(history.Move(ranges, 1))
 
     def check_to_items(self) -> None:
         has_items = self.to_model.rowCount() != 0
         self.apply_action.setEnabled(has_items)
 
     def check_to_selection(self) -> None:
-        selection = self._get_selected_items(self.to_list)
-        has_selection = len(selection) != 0
-        self.up_button.setEnabled(has_selection and min(selection) != 0)
+        ranges = self._get_selected_ranges(self.to_list)
+        has_selection = len(ranges) != 0
+        self.up_button.setEnabled(has_selection and ranges[0][0] != 0)
         self.down_button.setEnabled(
-            has_selection and max(selection) != self.to_model.rowCount() - 1
+            has_selection and ranges[-1][1] != self.to_model.rowCount() - 1
         )
         self.remove_button.setEnabled(has_selection)
 
@@ -606,54 +1407,408 @@ class MainWindow(W.QMainWindow):
         def convert(item: G.QStandardItem | None) -> Any:
             assert item is not None
             item_ = cast(ModelItem, item)
-            return {"filename": item_.filename, "index": item_.get_index()}
+            result = {"filename": item_.filename, "index": item_.get_index()}
+            metadata = item_.get_metadata()
+            if metadata is not None:
+                result["metadata"] = metadata
+            return result
 
         def get_items(model: G.QStandardItemModel) -> list[Any]:
             return [convert(model.item(row)) for row in range(model.rowCount())]
 
-        config.config["items"] = {
-            "from": get_items(self.from_model),
-            "to": get_items(self.to_model),
-        }
+        workspace.save(
+            self.workspace,
+            {
+                "items": {
+                    "from": get_items(self.from_model),
+                    "to": get_items(self.to_model),
+                    "sequence": self.history.sequence,
+                },
+                "settings": workspace.get_settings(),
+            },
+        )
         config.save_config()
+        self.history.checkpoint()
 
     def check_from_selection(self) -> None:
         sm = self.from_list.selectionModel()
         assert sm is not None
-        self.add_button.setEnabled(len(sm.selectedIndexes()) != 0)
+        self.add_button.setEnabled(sm.hasSelection())
 
     def apply(self) -> None:
-        dialog = apply.ApplyDialog(self)
+        plans: list[tuple[list[tuple[str, str]], list[tuple[str, str]]]] = []
+
+        def check(dialog: apply.ApplyDialog) -> list[str]:
+            target_directory = dialog.get_target_directory()
+            export_mode = dialog.is_export()
+            args = (
+                target_directory,
+                dialog.get_prefix(),
+                dialog.get_starting_number(),
+                dialog.get_decimals(),
+                ".jpg" if export_mode else None,
+            )
+            if dialog.is_merge():
+                plans[:] = [self._get_merge_plan(*args)]
+            else:
+                plans[:] = [([], self._get_apply_plan(*args))]
+            return self._preflight(
+                target_directory,
+                *plans[0],
+                move=not dialog.is_copy() and not export_mode,
+                # An export is usually smaller than its source, so count it as a
+                # copy for the free space.
+                copy=dialog.is_copy() or export_mode,
+            )
+
+        dialog = apply.ApplyDialog(self, preflight=check)
         res = dialog.exec()
         if res != W.QDialog.DialogCode.Accepted:
             return
 
         target_directory = dialog.get_target_directory()
-        prefix = dialog.get_prefix()
-        number = dialog.get_starting_number()
-        decimals = dialog.get_decimals()
-        copy = dialog.is_copy()
+        move = not dialog.is_copy() and not dialog.is_export()
+        renames, plan = plans[0]
         os.makedirs(target_directory, exist_ok=True)
-        while self.to_model.rowCount() != 0:
-            path = cast(ModelItem, self.to_model.item(0)).filename
-            extension = path[path.rfind(".") :]
-            numstr = str(number)
-            numstr = "0" * (max(0, decimals - len(numstr))) + numstr
-            new_path = os.path.join(
-                target_directory, "{}{}{}".format(prefix, numstr, extension)
-            )
-            if copy:
-                _ = shutil.copy(path, new_path)
-            else:
+        done_renames: list[tuple[str, str]] = []
+        try:
+            for path, new_path in renames:
                 os.rename(path, new_path)
-            number += 1
-            _ = self.to_model.removeRow(0)
-            self.loaded_files.remove(path)
+                done_renames.append((path, new_path))
+        except OSError as e:
+            _ = W.QMessageBox.warning(
+                self,
+                "Apply failed",
+                "Could not renumber the existing files:\n{}".format(e),
+            )
+            _ = self._roll_back(plan, set(), move, done_renames)
+            return
+
+        done, manifest = self._transfer(
+            plan,
+            dialog.is_copy(),
+            dialog.is_verified_copy(),
+            (
+                (dialog.get_export_size(), dialog.get_export_quality())
+                if dialog.is_export()
+                else None
+            ),
+        )
+        # The renames made room for all of the items, a partial merge would
+        # leave gaps in the sequence, so undo everything.
+        if renames and len(done) != len(plan):
+            done = self._roll_back(plan, done, move, done_renames)
+        entries = sorted(
+            entry for row, entry in manifest.items() if row in done
+        )
+        if entries:
+            _ = copier.write_manifest(target_directory, entries)
+        for row in reversed(range(len(plan))):
+            if row in done:
+                _ = self.to_model.removeRow(row)
+                self.loaded_files.remove(plan[row][0])
         self.check_to_items()
         self.check_to_selection()
+        self.history.clear()
+        self._check_history()
         self.save_items()
         self.load_pictures_task.run()
 
+    def _preflight(
+        self,
+        target_directory: str,
+        renames: list[tuple[str, str]],
+        plan: list[tuple[str, str]],
+        move: bool,
+        copy: bool,
+    ) -> list[str]:
+        sizes = [
+            cast(ModelItem, self.to_model.item(row)).get_file_size()
+            for row in range(self.to_model.rowCount())
+        ]
+        return preflight.check(
+            plan, sizes, target_directory, move, copy, renames=renames
+        )
+
+    def _transfer(
+        self,
+        plan: list[tuple[str, str]],
+        copy: bool,
+        verify: bool,
+        export_settings: tuple[int, int] | None,
+    ) -> tuple[set[int], dict[int, tuple[str, int, str]]]:
+        if export_settings is not None:
+            return self._export(plan, *export_settings), {}
+        if copy and verify:
+            manifest = self._verified_copy(plan)
+            return set(manifest), manifest
+
+        done: set[int] = set()
+        for row, (path, new_path) in enumerate(plan):
+            try:
+                if copy:
+                    _ = shutil.copy(path, new_path)
+                else:
+                    os.rename(path, new_path)
+            except OSError as e:
+                _ = W.QMessageBox.warning(
+                    self,
+                    "Apply failed",
+                    "{} could not be processed:\n{}".format(path, e),
+                )
+                break
+            done.add(row)
+        return done, {}
+
+    def _roll_back(
+        self,
+        plan: list[tuple[str, str]],
+        done: set[int],
+        move: bool,
+        renames: list[tuple[str, str]],
+    ) -> set[int]:
+        # Free the new names first, the existing files may get them back.
+        kept: set[int] = set()
+        errors: list[str] = []
+        for row in sorted(done):
+            path, new_path = plan[row]
+            try:
+                if move:
+                    os.rename(new_path, path)
+                else:
+                    os.remove(new_path)
+            except OSError as e:
+                kept.add(row)
+                errors.append("{}: {}".format(new_path, e))
+        for path, new_path in reversed(renames):
+            try:
+                # A rename would replace an item that could not be removed.
+                if os.path.lexists(path):
+                    raise FileExistsError(errno.EEXIST, "File exists", path)
+                os.rename(new_path, path)
+            except OSError as e:
+                errors.append("{}: {}".format(new_path, e))
+
+        if errors:
+            _ = W.QMessageBox.warning(
+                self,
+                "Rollback failed",
+                "The following files could not be restored:\n"
+                + "\n".join(errors),
+            )
+        # The items that could not be put back stay applied.
+        return kept
+
+    def _get_target_path(
+        self,
+        path: str,
+        target_directory: str,
+        prefix: str,
+        number: int,
+        decimals: int,
+        extension: str | None = None,
+    ) -> str:
+        if extension is None:
+            extension = path[path.rfind(".") :]
+        numstr = str(number)
+        numstr = "0" * (max(0, decimals - len(numstr))) + numstr
+        return os.path.join(
+            target_directory, "{}{}{}".format(prefix, numstr, extension)
+        )
+
+    def _get_apply_plan(
+        self,
+        target_directory: str,
+        prefix: str,
+        number: int,
+        decimals: int,
+        extension: str | None = None,
+    ) -> list[tuple[str, str]]:
+        plan: list[tuple[str, str]] = []
+        for row in range(self.to_model.rowCount()):
+            path = cast(ModelItem, self.to_model.item(row)).filename
+            plan.append(
+                (
+                    path,
+                    self._get_target_path(
+                        path,
+                        target_directory,
+                        prefix,
+                        number + row,
+                        decimals,
+                        extension,
+                    ),
+                )
+            )
+        return plan
+
+    def _get_merge_plan(
+        self,
+        target_directory: str,
+        prefix: str,
+        number: int,
+        decimals: int,
+        extension: str | None = None,
+    ) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+        existing = merge.find_existing(
+            target_directory, prefix, self._is_allowed
+        )
+        paths = [os.path.join(target_directory, name) for _, name in existing]
+        existing_timestamps = self._get_existing_timestamps(paths)
+        items = [
+            cast(ModelItem, self.to_model.item(row))
+            for row in range(self.to_model.rowCount())
+        ]
+        existing_numbers = [existing_number for existing_number, _ in existing]
+        existing_numbers, new_numbers = merge.plan_merge(
+            existing_numbers,
+            existing_timestamps,
+            [item.timestamp for item in items],
+            min([number] + existing_numbers[:1]),
+        )
+
+        renames = [
+            (
+                path,
+                self._get_target_path(
+                    path, target_directory, prefix, new_number, decimals
+                ),
+            )
+            for path, new_number in zip(paths, existing_numbers)
+        ]
+        plan = [
+            (
+                item.filename,
+                self._get_target_path(
+                    item.filename,
+                    target_directory,
+                    prefix,
+                    new_number,
+                    decimals,
+                    extension,
+                ),
+            )
+            for item, new_number in zip(items, new_numbers)
+        ]
+        taken = set(os.listdir(target_directory)) if existing else set()
+        return merge.order_renames(renames, taken), plan
+
+    def _get_existing_timestamps(self, paths: list[str]) -> list[int]:
+        keys: list[tuple[str, int, int]] = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                keys.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                keys.append((path, 0, -1))
+        # Pressing OK again, e.g. after fixing a preflight problem, only
+        # reads the files that are new or have changed since the last scan.
+        timestamps = {
+            key: self.existing_timestamps[key]
+            for key in keys
+            if key in self.existing_timestamps
+        }
+        missing = [key for key in keys if key not in timestamps]
+        if missing:
+            with futures.ThreadPoolExecutor(
+                config.config.get("copy_threads", min(8, os.cpu_count() or 1))
+            ) as executor:
+                results = executor.map(
+                    read_timestamp, [path for path, _, _ in missing]
+                )
+                timestamps.update(zip(missing, results))
+        self.existing_timestamps = timestamps
+        return [timestamps[key] for key in keys]
+
+    def _run_batch(
+        self,
+        label: str,
+        executor: futures.Executor,
+        function: Callable[[str, str], Any],
+        plan: list[tuple[str, str]],
+        max_pending: int,
+    ) -> dict[int, Any]:
+        progress = W.QProgressDialog(label, "Cancel", 0, len(plan), self)
+        progress.setWindowModality(C.Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+
+        results: dict[int, Any] = {}
+        errors: list[str] = []
+        pending: dict[futures.Future[Any], int] = {}
+        next_row = 0
+        while next_row < len(plan) or pending:
+            while (
+                next_row < len(plan)
+                and len(pending) < max_pending
+                and not progress.wasCanceled()
+            ):
+                pending[executor.submit(function, *plan[next_row])] = next_row
+                next_row += 1
+            if not pending:
+                break
+            finished, _ = futures.wait(
+                pending, timeout=0.1, return_when=futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                row = pending.pop(future)
+                try:
+                    results[row] = future.result()
+                except futures.CancelledError:
+                    pass
+                except Exception as e:
+                    errors.append("{}: {}".format(plan[row][0], e))
+            progress.setValue(len(results) + len(errors))
+            C.QCoreApplication.processEvents()
+            if progress.wasCanceled():
+                for future in pending:
+                    _ = future.cancel()
+        progress.close()
+
+        if errors:
+            _ = W.QMessageBox.warning(
+                self,
+                "Apply failed",
+                "The following files could not be processed:\n"
+                + "\n".join(errors),
+            )
+        return results
+
+    def _verified_copy(
+        self, plan: list[tuple[str, str]]
+    ) -> dict[int, tuple[str, int, str]]:
+        with futures.ThreadPoolExecutor(
+            config.config.get("copy_threads", min(8, os.cpu_count() or 1))
+        ) as executor:
+            results = self._run_batch(
+                "Copying files...",
+                executor,
+                copier.verified_copy,
+                plan,
+                len(plan),
+            )
+        return {
+            row: (plan[row][1], size, digest)
+            for row, (size, digest) in results.items()
+        }
+
+    def _export(
+        self, plan: list[tuple[str, str]], size: int, quality: int
+    ) -> set[int]:
+        processes = os.cpu_count() or 1
+        with futures.ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results = self._run_batch(
+                "Exporting files...",
+                executor,
+                functools.partial(
+                    export.export_image, size=size, quality=quality
+                ),
+                plan,
+                processes * 2,
+            )
+        return set(results)
+
     def _is_allowed(self, filename: str) -> bool:
         mime_type = self.mime_db.mimeTypeForFile(filename)
         return mime_type.inherits("image/jpeg") or mime_type.inherits(
@@ -669,7 +1824,6 @@ class MainWindow(W.QMainWindow):
                     file_path = os.path.join(path, entry.name)
                     if file_path not in self.loaded_files:
                         result.append(file_path)
-                result.sort()
                 if (
                     recursive
                     and entry.is_dir()
@@ -685,12 +1839,17 @@ class MainWindow(W.QMainWindow):
     def _add_dir(self, path: str, recursive: bool) -> None:
         path = os.path.abspath(path)
         images = self._get_files(path, recursive)
+        first = self.current_index
+        items: list[G.QStandardItem] = []
         for image in images:
-            self.from_model.appendRow(
-                [self._create_model_item(image, self.current_index)]
-            )
+            items.append(self._create_model_item(image, self.current_index))
             self.current_index += 1
             self.loaded_files.add(image)
+        # Insert the whole directory at once, so that the views and the
+        # filter update once instead of per file.
+        self.append_unsorted(items)
+        if images:
+            self._record(history.Load(first, images))
 
     def add_dir(self, recursive: bool) -> None:
         title = "Add tree" if recursive else "Add directory"
@@ -698,7 +1857,6 @@ class MainWindow(W.QMainWindow):
         if path is None:
             return
         self._add_dir(path, recursive)
-        self.save_items()
         self.load_pictures_task.run()
 
     def open_file(
@@ -0,0 +1,135 @@
+import bisect
+import os
+import re
+from typing import Callable
+
+
+def find_existing(
+    directory: str, prefix: str, is_allowed: Callable[[str], bool]
+) -> list[tuple[int, str]]:
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(re.escape(prefix) + r"(\d+)\.[^.]+")
+    result: list[tuple[int, str]] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            match = pattern.fullmatch(entry.name)
+            if match is not None and is_allowed(entry.name) and entry.is_file():
+                result.append((int(match.group(1)), entry.name))
+    result.sort()
+    return result
+
+
+def _merge(
+    existing_timestamps: list[int], new_timestamps: list[int]
+) -> list[tuple[bool, int]]:
+    new_order = sorted(
+        range(len(new_timestamps)), key=new_timestamps.__getitem__
+    )
+    result: list[tuple[bool, int]] = []
+    i = 0
+    for j in new_order:
+        while (
+            i < len(existing_timestamps)
+            and existing_timestamps[i] <= new_timestamps[j]
+        ):
+            result.append((True, i))
+            i += 1
+        result.append((False, j))
+    result.extend((True, k) for k in range(i, len(existing_timestamps)))
+    return result
+
+
+def _get_longest_run(keys: list[tuple[int, int]]) -> set[int]:
+    tails: list[int] = []
+    tail_ids: list[int] = []
+    previous: dict[int, int | None] = {}
+    for key, id in keys:
+        position = bisect.bisect_right(tails, key)
+        previous[id] = tail_ids[position - 1] if position != 0 else None
+        if position == len(tails):
+            tails.append(key)
+            tail_ids.append(id)
+        else:
+            tails[position] = key
+            tail_ids[position] = id
+
+    result: set[int] = set()
+    current = tail_ids[-1] if tail_ids else None
+    while current is not None:
+        result.add(current)
+        current = previous[current]
+    return result
+
+
+def plan_merge(
+    existing_numbers: list[int],
+    existing_timestamps: list[int],
+    new_timestamps: list[int],
+    base: int,
+) -> tuple[list[int], list[int]]:
+    order = _merge(existing_timestamps, new_timestamps)
+
+    # An existing file keeps its number if the number minus its position in
+    # the merged sequence is not less than that of the previous kept file,
+    # so that the files between them fit into the gap.
+    keys = [
+        (existing_numbers[id] - position, id)
+        for position, (is_existing, id) in enumerate(order)
+        if is_existing and existing_numbers[id] - position >= base
+    ]
+    kept = _get_longest_run(keys)
+
+    existing_result = [0] * len(existing_numbers)
+    new_result = [0] * len(new_timestamps)
+    number = base
+    for is_existing, id in order:
+        if is_existing:
+            if id in kept:
+                number = existing_numbers[id]
+            existing_result[id] = number
+        else:
+            new_result[id] = number
+        number += 1
+    return existing_result, new_result
+
+
+def _get_temporary_name(path: str, taken: set[str]) -> str:
+    directory, name = os.path.split(path)
+    i = 0
+    while True:
+        temporary = ".{}.merge{}".format(name, i)
+        if temporary not in taken:
+            taken.add(temporary)
+            return os.path.join(directory, temporary)
+        i += 1
+
+
+def order_renames(
+    renames: list[tuple[str, str]], taken: set[str]
+) -> list[tuple[str, str]]:
+    pending = {source: target for source, target in renames if source != target}
+    waiting = {target: source for source, target in pending.items()}
+    ready = [
+        source for source, target in pending.items() if target not in pending
+    ]
+    result: list[tuple[str, str]] = []
+    while pending:
+        while ready:
+            source = ready.pop()
+            result.append((source, pending.pop(source)))
+            next_source = waiting.pop(source, None)
+            if next_source is not None:
+                ready.append(next_source)
+        if pending:
+            # Only cycles are left, break one of them.
+            source, target = next(iter(pending.items()))
+            temporary = _get_temporary_name(source, taken)
+            result.append((source, temporary))
+            del pending[source]
+            pending[temporary] = target
+            waiting[target] = temporary
+            next_source = waiting.pop(source, None)
+            if next_source is not None:
+                ready.append(next_source)
+    return result
@@ -0,0 +1,126 @@
+import os
+import shutil
+
+max_listed = 5
+
+
+def _get_existing_parent(path: str) -> str:
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _get_names(directory: str) -> set[str]:
+    if not os.path.isdir(directory):
+        return set()
+    with os.scandir(directory) as it:
+        return {entry.name for entry in it}
+
+
+def _describe(message: str, paths: list[str]) -> str:
+    result = "{} ({}):\n".format(message, len(paths))
+    result += "\n".join("  " + path for path in paths[:max_listed])
+    if len(paths) > max_listed:
+        result += "\n  ... and {} more".format(len(paths) - max_listed)
+    return result
+
+
+def _format_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return "{:.1f} {}".format(value, unit)
+        value /= 1024
+    return "{:.1f} TiB".format(value)
+
+
+def _find_collisions(
+    operations: list[tuple[str, str, bool]], directory: str
+) -> list[str]:
+    occupied = _get_names(directory)
+    result: list[str] = []
+    for source, target, move in operations:
+        name = os.path.basename(target)
+        source_directory, source_name = os.path.split(source)
+        freed = move and source_directory == directory
+        if freed and source_name == name:
+            continue
+        if name in occupied:
+            result.append(target)
+        occupied.add(name)
+        if freed:
+            occupied.discard(source_name)
+    return result
+
+
+def check(
+    plan: list[tuple[str, str]],
+    sizes: list[int | None],
+    target_directory: str,
+    move: bool,
+    copy: bool,
+    renames: list[tuple[str, str]] | None = None,
+) -> list[str]:
+    directory = os.path.abspath(target_directory)
+    parent = _get_existing_parent(directory)
+    problems: list[str] = []
+
+    if os.path.exists(directory) and not os.path.isdir(directory):
+        return ["Target is not a directory: " + directory]
+    if not os.access(parent, os.W_OK | os.X_OK):
+        problems.append("Target directory is not writable: " + parent)
+
+    operations = [(source, target, True) for source, target in renames or []]
+    operations.extend((source, target, move) for source, target in plan)
+    collisions = _find_collisions(operations, directory)
+    if collisions:
+        problems.append(_describe("Target files already exist", collisions))
+
+    missing = [source for (source, _), size in zip(plan, sizes) if size is None]
+    if missing:
+        problems.append(_describe("Source files are missing", missing))
+
+    source_directories = {os.path.dirname(source) for source, _ in plan}
+    if move:
+        target_device = os.stat(parent).st_dev
+        read_only: list[str] = []
+        other_device: list[str] = []
+        for source_directory in sorted(source_directories):
+            if not os.access(source_directory, os.W_OK | os.X_OK):
+                read_only.append(source_directory)
+            try:
+                if os.stat(source_directory).st_dev != target_device:
+                    other_device.append(source_directory)
+            except OSError:
+                read_only.append(source_directory)
+        if read_only:
+            problems.append(
+                _describe(
+                    "Files cannot be moved out of these directories",
+                    read_only,
+                )
+            )
+        if other_device:
+            problems.append(
+                _describe(
+                    "Files cannot be moved to another file system, "
+                    "use copy instead",
+                    other_device,
+                )
+            )
+
+    if copy:
+        needed = sum(size for size in sizes if size is not None)
+        free = shutil.disk_usage(parent).free
+        if needed > free:
+            problems.append(
+                "Not enough free space: {} needed, {} available.".format(
+                    _format_size(needed), _format_size(free)
+                )
+            )
+
+    return problems
@@ -0,0 +1,685 @@
+import os
+
+_ = os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import PyQt6.QtWidgets as W
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+import argparse
+import datetime
+import gc
+import json
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, cast, final
+
+import apply
+import config
+import delegate
+
+actions = [
+    "add_dir",
+    "set_sort",
+    "add_items",
+    "move_up",
+    "move_down",
+    "resize_pictures",
+    "apply",
+    "clear",
+]
+
+files_per_directory = 1000
+heartbeat_interval = 5
+default_metadata_ceiling = 4096.0
+# Icons are loaded somewhat larger than the zoom level, and the delegate
+# keeps a copy scaled to it in the pixmap cache.
+default_pixmap_ceiling = 12.0
+
+
+def create_tree(path: str, count: int) -> None:
+    templates: list[str] = []
+    for i, color in enumerate(("red", "green", "blue", "gray")):
+        image = G.QImage(640, 480, G.QImage.Format.Format_RGB32)
+        image.fill(G.QColor(color))
+        template = os.path.join(path, "template{}.jpg".format(i))
+        _ = image.save(template)
+        templates.append(template)
+
+    start = datetime.datetime(2020, 1, 1)
+    for i in range(count):
+        directory = os.path.join(
+            path, "tree", "dir{:04}".format(i // files_per_directory)
+        )
+        if i % files_per_directory == 0:
+            os.makedirs(directory, exist_ok=True)
+        date = start + datetime.timedelta(seconds=37 * i)
+        filename = os.path.join(
+            directory, date.strftime("IMG_%Y%m%d_%H%M%S.jpg")
+        )
+        template = templates[i % len(templates)]
+        try:
+            os.link(template, filename)
+        except OSError:
+            _ = shutil.copyfile(template, filename)
+
+
+@final
+class MemoryResult:
+    def __init__(
+        self,
+        items: int,
+        model: str,
+        zoom: int,
+        rows: int,
+        loaded: int,
+        size: int,
+    ):
+        self.items = items
+        self.model = model
+        self.zoom = zoom
+        self.rows = rows
+        self.loaded = loaded
+        self.size = size
+        self.failures: list[str] = []
+
+    def get_bytes_per_item(self) -> float:
+        return self.size / self.loaded if self.loaded != 0 else 0.0
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "items": self.items,
+            "model": self.model,
+            "zoom": self.zoom,
+            "rows": self.rows,
+            "loaded": self.loaded,
+            "bytes": self.size,
+            "bytes_per_item": self.get_bytes_per_item(),
+            "failures": self.failures,
+        }
+
+
+def get_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1])
+        return resident * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        pass
+    # Without /proc only the peak of the whole process is available.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@final
+class StallMonitor:
+    def __init__(self) -> None:
+        self.timer = C.QTimer()
+        self.timer.setInterval(heartbeat_interval)
+        _ = self.timer.timeout.connect(self._beat)
+        self.last = 0.0
+        self.max_stall = 0.0
+        self.peak_rss = 0
+
+    def _beat(self) -> None:
+        now = time.perf_counter()
+        self.max_stall = max(self.max_stall, now - self.last)
+        self.last = now
+        self.peak_rss = max(self.peak_rss, get_rss())
+
+    def start(self) -> None:
+        self.last = time.perf_counter()
+        self.max_stall = 0.0
+        self.peak_rss = get_rss()
+        self.timer.start()
+
+    def stop(self) -> float:
+        self._beat()
+        self.timer.stop()
+        return self.max_stall
+
+
+@final
+class Result:
+    def __init__(
+        self,
+        items: int,
+        action: str,
+        call: float,
+        wall: float,
+        stall: float,
+        rss_before: int,
+        rss_after: int,
+        peak_rss: int,
+    ):
+        self.items = items
+        self.action = action
+        self.call = call
+        self.wall = wall
+        self.stall = stall
+        self.rss_before = rss_before
+        self.rss_after = rss_after
+        self.peak_rss = peak_rss
+        self.failures: list[str] = []
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "items": self.items,
+            "action": self.action,
+            "call": self.call,
+            "wall": self.wall,
+            "stall": self.stall,
+            "rss_before": self.rss_before,
+            "rss_after": self.rss_after,
+            "peak_rss": self.peak_rss,
+            "failures": self.failures,
+        }
+
+
+def is_busy(window: Any) -> bool:
+    decoder = window.decoder
+    return (
+        window.load_pictures_task.is_running()
+        or window.upgrade_pictures_task.is_running()
+        or window.upgrade_timer.isActive()
+        or window.filter_timer.isActive()
+        or window.timeline_timer.isActive()
+        or (decoder is not None and not decoder.is_idle())
+    )
+
+
+def settle(app: W.QApplication, window: Any, timeout: float) -> None:
+    end = time.perf_counter() + timeout
+    app.processEvents()
+    while is_busy(window) and time.perf_counter() < end:
+        app.processEvents(C.QEventLoop.ProcessEventsFlag.AllEvents, 10)
+        time.sleep(0.001)
+    app.processEvents()
+
+
+def answer_modal(callback: Callable[[W.QWidget], None]) -> None:
+    def check() -> None:
+        widget = W.QApplication.activeModalWidget()
+        if widget is None:
+            C.QTimer.singleShot(1, check)
+            return
+        callback(widget)
+
+    C.QTimer.singleShot(0, check)
+
+
+def click_button(text: str) -> Callable[[W.QWidget], None]:
+    def click(widget: W.QWidget) -> None:
+        assert isinstance(widget, W.QMessageBox)
+        for button in widget.buttons():
+            if button.text() == text:
+                button.click()
+                return
+        raise RuntimeError("No button: " + text)
+
+    return click
+
+
+def fill_apply_dialog(target: str) -> Callable[[W.QWidget], None]:
+    def fill(widget: W.QWidget) -> None:
+        assert isinstance(widget, apply.ApplyDialog)
+        widget.target_directory_edit.setText(target)
+        widget.prefix_edit.setText("bench")
+        widget.rename_button.setChecked(True)
+        ok_button = widget.button_box.button(
+            W.QDialogButtonBox.StandardButton.Ok
+        )
+        assert ok_button is not None
+        ok_button.click()
+
+    return fill
+
+
+def select_rows(view: W.QListView, ranges: list[tuple[int, int]]) -> None:
+    model = view.model()
+    sm = view.selectionModel()
+    assert model is not None
+    assert sm is not None
+    selection = C.QItemSelection()
+    for top, bottom in ranges:
+        selection.select(model.index(top, 0), model.index(bottom, 0))
+    sm.select(selection, C.QItemSelectionModel.SelectionFlag.ClearAndSelect)
+
+
+def get_stripes(count: int, stripes: int) -> list[tuple[int, int]]:
+    step = max(2, count // stripes)
+    return [
+        (row, min(count - 1, row + step // 2 - 1))
+        for row in range(0, count, step)
+    ]
+
+
+def run_actions(
+    app: W.QApplication, window: Any, tree: str, target: str, items: int
+) -> list[tuple[str, Callable[[], None]]]:
+    def add_dir() -> None:
+        window._add_dir(tree, recursive=True)
+
+    def set_sort() -> None:
+        for name in ("name", "date", "index"):
+            window.set_sort(name)
+
+    def add_items() -> None:
+        count = window.from_model.rowCount()
+        select_rows(window.from_list, get_stripes(count, 100))
+        window.add_items()
+
+    def move_up() -> None:
+        count = window.to_model.rowCount()
+        select_rows(window.to_list, [(1, min(count, 1 + items // 100) - 1)])
+        window.move_up()
+
+    def move_down() -> None:
+        count = window.to_model.rowCount()
+        select_rows(window.to_list, [(0, min(count, items // 100) - 1)])
+        window.move_down()
+
+    def resize_pictures() -> None:
+        window.resize_pictures(window.picture_size + 10)
+
+    def apply_items() -> None:
+        answer_modal(fill_apply_dialog(target))
+        window.apply()
+
+    def clear() -> None:
+        answer_modal(click_button("Clear everything"))
+        window.clear()
+
+    return [
+        ("add_dir", add_dir),
+        ("set_sort", set_sort),
+        ("add_items", add_items),
+        ("move_up", move_up),
+        ("move_down", move_down),
+        ("resize_pictures", resize_pictures),
+        ("apply", apply_items),
+        ("clear", clear),
+    ]
+
+
+def create_window(
+    app: W.QApplication, picture_size: int, settle_timeout: float
+) -> Any:
+    import main
+    import workspace
+
+    workspace.remove(workspace.get_current())
+    config.config["picture_size"] = picture_size
+    window = main.MainWindow([])
+    window.show()
+    settle(app, window, settle_timeout)
+    return window
+
+
+def close_window(app: W.QApplication, window: Any) -> None:
+    window.to_model.clear()
+    _ = window.close()
+    window.deleteLater()
+    app.processEvents()
+
+
+def measure_actions(
+    app: W.QApplication,
+    tree: str,
+    target: str,
+    items: int,
+    picture_size: int,
+    settle_timeout: float,
+) -> list[Result]:
+    window = create_window(app, picture_size, settle_timeout)
+    monitor = StallMonitor()
+    results: list[Result] = []
+    for name, action in run_actions(app, window, tree, target, items):
+        rss_before = get_rss()
+        monitor.start()
+        start = time.perf_counter()
+        action()
+        call = time.perf_counter() - start
+        settle(app, window, settle_timeout)
+        wall = time.perf_counter() - start
+        stall = monitor.stop()
+        results.append(
+            Result(
+                items,
+                name,
+                call,
+                wall,
+                stall,
+                rss_before,
+                get_rss(),
+                monitor.peak_rss,
+            )
+        )
+    close_window(app, window)
+    return results
+
+
+def get_icon_bytes(icon: G.QIcon) -> int:
+    result = 0
+    for size in icon.availableSizes():
+        result += get_pixmap_bytes(icon.pixmap(size))
+    return result
+
+
+def get_pixmap_bytes(pixmap: G.QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+def get_pixmap_usage(
+    items: int,
+    name: str,
+    view: W.QListView,
+    model: G.QStandardItemModel,
+    zoom: int,
+) -> MemoryResult:
+    view_delegate = cast(delegate.ThumbnailDelegate, view.itemDelegate())
+    viewport = view.viewport()
+    assert viewport is not None
+    ratio = viewport.devicePixelRatioF()
+    loaded = 0
+    pixmap_bytes = 0
+    for row in range(model.rowCount()):
+        item = model.item(row)
+        assert item is not None
+        icon = item.icon()
+        icon_bytes = get_icon_bytes(icon)
+        if icon_bytes != 0:
+            loaded += 1
+            pixmap_bytes += icon_bytes
+            # The scaled copy the delegate paints from, if it is cached.
+            cached = G.QPixmapCache.find(
+                view_delegate.get_cache_key(icon, ratio)
+            )
+            if cached is not None:
+                pixmap_bytes += get_pixmap_bytes(cached)
+    return MemoryResult(
+        items, name, zoom, model.rowCount(), loaded, pixmap_bytes
+    )
+
+
+def measure_memory(
+    app: W.QApplication,
+    tree: str,
+    items: int,
+    zoom_levels: list[int],
+    settle_timeout: float,
+) -> tuple[MemoryResult, list[MemoryResult]]:
+    zoom_levels = sorted(zoom_levels)
+    window = create_window(app, zoom_levels[0], settle_timeout)
+
+    _ = gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    window._add_dir(tree, recursive=True)
+    settle(app, window, settle_timeout)
+    # Items read their metadata lazily, measure them as they are after the
+    # background hydration.
+    window._hydrate_items(lambda: None)
+    _ = gc.collect()
+    metadata = MemoryResult(
+        items,
+        "metadata",
+        window.picture_size,
+        window.from_model.rowCount(),
+        window.from_model.rowCount(),
+        tracemalloc.get_traced_memory()[0] - before,
+    )
+    tracemalloc.stop()
+
+    count = window.from_model.rowCount()
+    select_rows(window.from_list, get_stripes(count, 100))
+    window.add_items()
+    settle(app, window, settle_timeout)
+
+    pixmaps: list[MemoryResult] = []
+    for zoom in zoom_levels:
+        window.resize_pictures(zoom)
+        settle(app, window, settle_timeout)
+        for view in (window.from_list, window.to_list):
+            view.viewport().repaint()
+        pixmaps.append(
+            get_pixmap_usage(
+                items, "from", window.from_list, window.from_model, zoom
+            )
+        )
+        pixmaps.append(
+            get_pixmap_usage(items, "to", window.to_list, window.to_model, zoom)
+        )
+    close_window(app, window)
+    return metadata, pixmaps
+
+
+def parse_budgets(values: list[str]) -> dict[str, float]:
+    result: dict[str, float] = {}
+    for value in values:
+        name, _, seconds = value.partition("=")
+        if name not in actions:
+            raise argparse.ArgumentTypeError("Unknown action: " + name)
+        result[name] = float(seconds)
+    return result
+
+
+def check(
+    results: list[Result],
+    budgets: dict[str, float],
+    default_budget: float,
+    stall_budget: float,
+) -> bool:
+    ok = True
+    for result in results:
+        budget = budgets.get(result.action, default_budget)
+        if result.wall > budget:
+            result.failures.append(
+                "wall time {:.3f}s > {:.3f}s".format(result.wall, budget)
+            )
+        if result.stall > stall_budget:
+            result.failures.append(
+                "stall {:.3f}s > {:.3f}s".format(result.stall, stall_budget)
+            )
+        ok = ok and not result.failures
+    return ok
+
+
+def check_memory(
+    results: list[MemoryResult],
+    metadata_ceiling: float,
+    pixmap_ceiling: float,
+) -> bool:
+    ok = True
+    for result in results:
+        if result.model == "metadata":
+            ceiling = metadata_ceiling
+        else:
+            ceiling = pixmap_ceiling * result.zoom * result.zoom
+        if result.get_bytes_per_item() > ceiling:
+            result.failures.append(
+                "{:.0f} B/item > {:.0f} B/item".format(
+                    result.get_bytes_per_item(), ceiling
+                )
+            )
+        ok = ok and not result.failures
+    return ok
+
+
+def print_results(results: list[Result]) -> None:
+    print(
+        "{:>8} {:<16} {:>10} {:>10} {:>10} {:>10} {:>10}  {}".format(
+            "items",
+            "action",
+            "call [s]",
+            "wall [s]",
+            "stall [s]",
+            "peak [MB]",
+            "delta [MB]",
+            "status",
+        )
+    )
+    for result in results:
+        print(
+            (
+                "{:>8} {:<16} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.1f} "
+                "{:>+10.1f}  {}"
+            ).format(
+                result.items,
+                result.action,
+                result.call,
+                result.wall,
+                result.stall,
+                result.peak_rss / 2**20,
+                (result.rss_after - result.rss_before) / 2**20,
+                "; ".join(result.failures) or "ok",
+            )
+        )
+
+
+def print_memory_results(results: list[MemoryResult]) -> None:
+    print(
+        "{:>8} {:<10} {:>6} {:>8} {:>8} {:>10} {:>12}  {}".format(
+            "items",
+            "model",
+            "zoom",
+            "rows",
+            "loaded",
+            "total [MB]",
+            "[B/item]",
+            "status",
+        )
+    )
+    for result in results:
+        print(
+            "{:>8} {:<10} {:>6} {:>8} {:>8} {:>10.1f} {:>12.0f}  {}".format(
+                result.items,
+                result.model,
+                result.zoom,
+                result.rows,
+                result.loaded,
+                result.size / 2**20,
+                result.get_bytes_per_item(),
+                "; ".join(result.failures) or "ok",
+            )
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure MainWindow actions on synthetic image trees."
+    )
+    _ = parser.add_argument(
+        "--items", type=int, nargs="+", default=[10000, 50000, 200000]
+    )
+    _ = parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="ACTION=SECONDS",
+        help="Wall time budget of one action, including the time until "
+        "background loading finishes.",
+    )
+    _ = parser.add_argument(
+        "--default-budget",
+        type=float,
+        default=60.0,
+        help="Wall time budget of actions without an explicit budget.",
+    )
+    _ = parser.add_argument(
+        "--stall-budget",
+        type=float,
+        default=5.0,
+        help="Longest allowed period without the event loop running.",
+    )
+    _ = parser.add_argument("--picture-size", type=int, default=100)
+    _ = parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Also measure the memory used per item, in a separate window.",
+    )
+    _ = parser.add_argument(
+        "--zoom-levels", type=int, nargs="+", default=[64, 128, 256]
+    )
+    _ = parser.add_argument(
+        "--metadata-ceiling",
+        type=float,
+        default=default_metadata_ceiling,
+        help="Maximum Python heap bytes per item, measured by tracemalloc.",
+    )
+    _ = parser.add_argument(
+        "--pixmap-ceiling",
+        type=float,
+        default=default_pixmap_ceiling,
+        help="Maximum pixmap bytes per loaded item, per square pixel of the "
+        "zoom level.",
+    )
+    _ = parser.add_argument("--settle-timeout", type=float, default=600.0)
+    _ = parser.add_argument("--work-dir", help="Directory for the trees.")
+    _ = parser.add_argument("--output", help="Write the results as JSON.")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget)
+
+    work_dir = tempfile.mkdtemp(prefix="photo-organizer-", dir=args.work_dir)
+    os.environ["XDG_CACHE_HOME"] = os.path.join(work_dir, "cache")
+    config.config_file_name = os.path.join(work_dir, "photo-organizer.json")
+    config.load_config()
+
+    app = W.QApplication([])
+    results: list[Result] = []
+    memory_results: list[MemoryResult] = []
+    try:
+        for items in args.items:
+            path = os.path.join(work_dir, str(items))
+            tree = os.path.join(path, "tree")
+            target = os.path.join(work_dir, "target{}".format(items))
+            os.makedirs(path)
+            create_tree(path, items)
+            if args.memory:
+                metadata, pixmaps = measure_memory(
+                    app, tree, items, args.zoom_levels, args.settle_timeout
+                )
+                memory_results.append(metadata)
+                memory_results.extend(pixmaps)
+            results.extend(
+                measure_actions(
+                    app,
+                    tree,
+                    target,
+                    items,
+                    args.picture_size,
+                    args.settle_timeout,
+                )
+            )
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.rmtree(target, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    del app
+
+    ok = check(results, budgets, args.default_budget, args.stall_budget)
+    memory_ok = check_memory(
+        memory_results, args.metadata_ceiling, args.pixmap_ceiling
+    )
+    print_results(results)
+    if memory_results:
+        print()
+        print_memory_results(memory_results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "actions": [result.to_json() for result in results],
+                    "memory": [result.to_json() for result in memory_results],
+                },
+                f,
+                indent=2,
+            )
+    return 0 if ok and memory_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+import PyQt6.QtCore as C
+import array
+import bisect
+import fnmatch
+import re
+from typing import Any, Callable, Iterable, final, override
+
+wildcards = "*?["
+max_character = "\U0010ffff"
+
+
+def _get_trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _get_name_pattern(pattern: str) -> str:
+    pattern = pattern.lower()
+    if not any(c in pattern for c in wildcards):
+        pattern = "*" + pattern + "*"
+    return pattern
+
+
+def get_name_matcher(pattern: str) -> Callable[[str], bool]:
+    regex = re.compile(fnmatch.translate(_get_name_pattern(pattern)))
+    return lambda name: regex.match(name.lower()) is not None
+
+
+@final
+class SearchIndex:
+    def __init__(self, names: list[str], timestamps: "array.array[int]"):
+        self.names = [name.lower() for name in names]
+        name_order = sorted(range(len(names)), key=self.names.__getitem__)
+        self.name_keys = [self.names[row] for row in name_order]
+        self.name_rows = array.array("l", name_order)
+        self.__trigrams: "dict[str, array.array[int]] | None" = None
+
+        self.timestamps = timestamps
+        date_order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        self.date_keys = array.array(
+            "q", (timestamps[row] for row in date_order)
+        )
+        self.date_rows = array.array("l", date_order)
+
+    def _get_trigrams(self) -> "dict[str, array.array[int]]":
+        if self.__trigrams is None:
+            self.__trigrams = {}
+            for row, name in enumerate(self.names):
+                for trigram in _get_trigrams(name):
+                    self.__trigrams.setdefault(
+                        trigram, array.array("l")
+                    ).append(row)
+        return self.__trigrams
+
+    def _find_prefix(self, prefix: str) -> Iterable[int]:
+        first = bisect.bisect_left(self.name_keys, prefix)
+        last = bisect.bisect_left(self.name_keys, prefix + max_character)
+        return self.name_rows[first:last]
+
+    def _find_substring(self, text: str) -> Iterable[int]:
+        trigrams = self._get_trigrams()
+        postings = [
+            trigrams.get(trigram, array.array("l"))
+            for trigram in _get_trigrams(text)
+        ]
+        return min(postings, key=len)
+
+    def find_names(self, pattern: str) -> Iterable[int]:
+        pattern = _get_name_pattern(pattern)
+        prefix = re.split("[" + re.escape(wildcards) + "]", pattern)[0]
+        longest = max(re.split(r"[*?]|\[[^]]*\]", pattern), key=len)
+
+        candidates: Iterable[int]
+        if prefix:
+            candidates = self._find_prefix(prefix)
+        elif len(longest) >= 3:
+            candidates = self._find_substring(longest)
+        else:
+            candidates = range(len(self.names))
+
+        regex = re.compile(fnmatch.translate(pattern))
+        return (row for row in candidates if regex.match(self.names[row]))
+
+    def find_dates(self, start: int, end: int) -> Iterable[int]:
+        first = bisect.bisect_left(self.date_keys, start)
+        last = bisect.bisect_right(self.date_keys, end)
+        return self.date_rows[first:last]
+
+
+@final
+class FilterModel(C.QAbstractProxyModel):
+    source_changed = C.pyqtSignal()
+
+    def __init__(self, source: C.QAbstractItemModel):
+        super(FilterModel, self).__init__()
+        self.rows: list[int] = []
+        self.inverse: dict[int, int] = {}
+        self.accepts: Callable[[int], bool] | None = None
+        self.setSourceModel(source)
+        # Inserted and removed rows only shift the mapping, reordering the
+        # source needs a reset.
+        _ = source.rowsInserted.connect(self._rows_inserted)
+        _ = source.rowsAboutToBeRemoved.connect(self._rows_about_to_be_removed)
+        _ = source.rowsRemoved.connect(self._rows_removed)
+        for about_to_change in (
+            source.layoutAboutToBeChanged,
+            source.modelAboutToBeReset,
+        ):
+            _ = about_to_change.connect(self._begin_change)  # type: ignore
+        for changed in (source.layoutChanged, source.modelReset):
+            _ = changed.connect(self._end_change)  # type: ignore
+        _ = source.dataChanged.connect(self._forward_data_changed)
+
+    def set_rows(
+        self, rows: list[int], accepts: Callable[[int], bool] | None = None
+    ) -> None:
+        self.beginResetModel()
+        self.rows = rows
+        self.inverse = {row: i for i, row in enumerate(rows)}
+        self.accepts = accepts
+        self.endResetModel()
+
+    def get_ranges(self) -> list[tuple[int, int]]:
+        result: list[tuple[int, int]] = []
+        for row in self.rows:
+            if result and result[-1][1] == row - 1:
+                result[-1] = (result[-1][0], row)
+            else:
+                result.append((row, row))
+        return result
+
+    def _shift(self, first: int, diff: int) -> None:
+        position = bisect.bisect_left(self.rows, first)
+        for i in range(position, len(self.rows)):
+            del self.inverse[self.rows[i]]
+            self.rows[i] += diff
+        for i in range(position, len(self.rows)):
+            self.inverse[self.rows[i]] = i
+
+    def _rows_inserted(
+        self, parent: C.QModelIndex, first: int, last: int
+    ) -> None:
+        if self.rows and self.rows[-1] >= first:
+            self._shift(first, last - first + 1)
+        if self.accepts is None:
+            return
+        # Only the new rows need to be filtered, they are next to each other
+        # in the proxy too.
+        new_rows = [row for row in range(first, last + 1) if self.accepts(row)]
+        if not new_rows:
+            return
+        position = bisect.bisect_left(self.rows, first)
+        self.beginInsertRows(
+            C.QModelIndex(), position, position + len(new_rows) - 1
+        )
+        self.rows[position:position] = new_rows
+        for i in range(position, len(self.rows)):
+            self.inverse[self.rows[i]] = i
+        self.endInsertRows()
+
+    def _rows_about_to_be_removed(
+        self, parent: C.QModelIndex, first: int, last: int
+    ) -> None:
+        begin = bisect.bisect_left(self.rows, first)
+        end = bisect.bisect_right(self.rows, last)
+        if begin == end:
+            return
+        self.beginRemoveRows(C.QModelIndex(), begin, end - 1)
+        for row in self.rows[begin:end]:
+            del self.inverse[row]
+        del self.rows[begin:end]
+        self.endRemoveRows()
+
+    def _rows_removed(
+        self, parent: C.QModelIndex, first: int, last: int
+    ) -> None:
+        if self.rows and self.rows[-1] > last:
+            self._shift(last + 1, first - last - 1)
+
+    def _begin_change(self, *args: Any) -> None:
+        self.beginResetModel()
+
+    def _end_change(self, *args: Any) -> None:
+        self.rows = []
+        self.inverse = {}
+        self.endResetModel()
+        self.source_changed.emit()
+
+    def _forward_data_changed(
+        self,
+        top_left: C.QModelIndex,
+        bottom_right: C.QModelIndex,
+        roles: list[int],
+    ) -> None:
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_row = self.inverse.get(row)
+            if proxy_row is not None:
+                index = self.createIndex(proxy_row, 0)
+                self.dataChanged.emit(index, index, roles)
+
+    @override
+    def index(
+        self, row: int, column: int, parent: C.QModelIndex = C.QModelIndex()
+    ) -> C.QModelIndex:
+        if parent.isValid() or row < 0 or row >= len(self.rows):
+            return C.QModelIndex()
+        return self.createIndex(row, column)
+
+    @override
+    def parent(self, child: C.QModelIndex) -> C.QModelIndex:  # type: ignore
+        return C.QModelIndex()
+
+    @override
+    def rowCount(self, parent: C.QModelIndex = C.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    @override
+    def columnCount(self, parent: C.QModelIndex = C.QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1
+
+    @override
+    def mapToSource(self, proxyIndex: C.QModelIndex) -> C.QModelIndex:
+        source = self.sourceModel()
+        if source is None or not proxyIndex.isValid():
+            return C.QModelIndex()
+        return source.index(self.rows[proxyIndex.row()], proxyIndex.column())
+
+    @override
+    def mapSelectionFromSource(
+        self, sourceSelection: C.QItemSelection
+    ) -> C.QItemSelection:
+        # The default maps only the corners of each range, which are usually
+        # filtered out.
+        result = C.QItemSelection()
+        for i in range(len(sourceSelection)):
+            source_range = sourceSelection[i]
+            begin = bisect.bisect_left(self.rows, source_range.top())
+            end = bisect.bisect_right(self.rows, source_range.bottom())
+            if begin != end:
+                result.select(
+                    self.createIndex(begin, 0), self.createIndex(end - 1, 0)
+                )
+        return result
+
+    @override
+    def mapFromSource(self, sourceIndex: C.QModelIndex) -> C.QModelIndex:
+        if not sourceIndex.isValid():
+            return C.QModelIndex()
+        row = self.inverse.get(sourceIndex.row())
+        if row is None:
+            return C.QModelIndex()
+        return self.createIndex(row, sourceIndex.column())
@@ -0,0 +1,39 @@
+import os
+import sys
+
+_ = os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyQt6.QtWidgets as W
+import pytest
+from typing import Any, Iterator
+
+import config
+
+
+@pytest.fixture(scope="session")
+def app() -> W.QApplication:
+    instance = W.QApplication.instance()
+    if instance is None:
+        instance = W.QApplication(sys.argv[:1])
+    assert isinstance(instance, W.QApplication)
+    return instance
+
+
+@pytest.fixture
+def config_dir(tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> str:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        config, "config_file_name", str(tmp_path / "config.json")
+    )
+    config.load_config()
+    return str(tmp_path)
+
+
+@pytest.fixture
+def window(app: W.QApplication, config_dir: str) -> Iterator[Any]:
+    import scalability
+
+    window = scalability.create_window(app, 64, 60.0)
+    yield window
+    scalability.close_window(app, window)
@@ -0,0 +1,257 @@
+import datetime
+import os
+import shutil
+from typing import Any
+
+import PyQt6.QtWidgets as W
+import pytest
+
+import apply
+import config
+import main
+import preflight
+import scalability
+
+
+def test_failed_preflight_keeps_config(
+    app: W.QApplication, config_dir: str
+) -> None:
+    problems = ["collision"]
+    dialog = apply.ApplyDialog(preflight=lambda dialog: problems)
+    dialog.prefix_edit.setText("new_")
+    ok_button = dialog.button_box.button(W.QDialogButtonBox.StandardButton.Ok)
+    assert ok_button is not None
+    ok_button.click()
+    assert dialog.result() != W.QDialog.DialogCode.Accepted
+    assert "prefix" not in config.config
+    assert not os.path.exists(config.config_file_name)
+
+    problems.clear()
+    ok_button.click()
+    assert dialog.result() == W.QDialog.DialogCode.Accepted
+    assert config.config["prefix"] == "new_"
+    assert os.path.exists(config.config_file_name)
+
+
+def create_merge_target(config_dir: str) -> tuple[str, dict[str, bytes]]:
+    target = os.path.join(config_dir, "target")
+    os.makedirs(target)
+    contents: dict[str, bytes] = {}
+    for i, minute in enumerate((0, 1)):
+        name = "bench{:04}.jpg".format(i)
+        contents[name] = os.urandom(1000)
+        path = os.path.join(target, name)
+        with open(path, "wb") as f:
+            _ = f.write(contents[name])
+        date = datetime.datetime(2020, 1, 1, 0, minute, 20).timestamp()
+        os.utime(path, (date, date))
+    return target, contents
+
+
+def get_contents(target: str) -> dict[str, bytes]:
+    result: dict[str, bytes] = {}
+    for name in os.listdir(target):
+        with open(os.path.join(target, name), "rb") as f:
+            result[name] = f.read()
+    return result
+
+
+def close_warning(widget: W.QWidget) -> None:
+    assert isinstance(widget, W.QMessageBox)
+    widget.accept()
+
+
+def fill_merge_dialog(widget: W.QWidget, target: str) -> None:
+    assert isinstance(widget, apply.ApplyDialog)
+    widget.target_directory_edit.setText(target)
+    widget.prefix_edit.setText("bench")
+    widget.copy_button.setChecked(True)
+    widget.verify_check_box.setChecked(False)
+    widget.merge_check_box.setChecked(True)
+    ok_button = widget.button_box.button(W.QDialogButtonBox.StandardButton.Ok)
+    assert ok_button is not None
+    ok_button.click()
+
+
+def apply_merge(
+    app: W.QApplication, window: Any, target: str, fails: bool = False
+) -> None:
+    def fill(widget: W.QWidget) -> None:
+        if fails:
+            scalability.answer_modal(close_warning)
+        fill_merge_dialog(widget, target)
+
+    scalability.answer_modal(fill)
+    window.apply()
+
+
+@pytest.fixture
+def merge_window(window: Any, config_dir: str) -> Any:
+    scalability.create_tree(config_dir, 4)
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    scalability.select_rows(window.from_list, [(0, 3)])
+    window.add_items()
+    return window
+
+
+def test_failed_merge_restores_target(
+    app: W.QApplication,
+    merge_window: Any,
+    config_dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    target, contents = create_merge_target(config_dir)
+    copy = shutil.copy
+    copied: list[str] = []
+
+    def failing_copy(source: str, destination: str) -> Any:
+        if copied:
+            raise OSError("disk full")
+        copied.append(destination)
+        return copy(source, destination)
+
+    monkeypatch.setattr(shutil, "copy", failing_copy)
+    apply_merge(app, merge_window, target, fails=True)
+
+    assert copied
+    assert get_contents(target) == contents
+    assert merge_window.to_model.rowCount() == 4
+
+
+def test_failed_rollback_is_reported(
+    app: W.QApplication,
+    merge_window: Any,
+    config_dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    target, contents = create_merge_target(config_dir)
+    copy = shutil.copy
+    copied: list[str] = []
+    warnings: list[str] = []
+
+    def failing_copy(source: str, destination: str) -> Any:
+        if copied:
+            raise OSError("disk full")
+        copied.append(destination)
+        return copy(source, destination)
+
+    def failing_remove(path: str) -> None:
+        raise OSError("read-only")
+
+    def close_warnings(widget: W.QWidget) -> None:
+        assert isinstance(widget, W.QMessageBox)
+        warnings.append(widget.windowTitle())
+        if len(warnings) < 2:
+            scalability.answer_modal(close_warnings)
+        widget.accept()
+
+    def fill(widget: W.QWidget) -> None:
+        scalability.answer_modal(close_warnings)
+        fill_merge_dialog(widget, target)
+
+    monkeypatch.setattr(shutil, "copy", failing_copy)
+    monkeypatch.setattr(os, "remove", failing_remove)
+    scalability.answer_modal(fill)
+    merge_window.apply()
+
+    assert warnings == ["Apply failed", "Rollback failed"]
+    result = get_contents(target)
+    assert set(contents.values()) <= set(result.values())
+    with open(copied[0], "rb") as f:
+        assert f.read() in result.values()
+    # The copy that could not be removed stays applied.
+    assert merge_window.to_model.rowCount() == 3
+
+
+def test_merge(app: W.QApplication, merge_window: Any, config_dir: str) -> None:
+    target, contents = create_merge_target(config_dir)
+    apply_merge(app, merge_window, target)
+
+    result = get_contents(target)
+    assert len(result) == 6
+    assert set(contents.values()) <= set(result.values())
+    assert merge_window.to_model.rowCount() == 0
+
+
+def test_existing_timestamps_are_cached(
+    window: Any, config_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    target, contents = create_merge_target(config_dir)
+    paths = [os.path.join(target, name) for name in sorted(contents)]
+    read: list[str] = []
+    read_timestamp = main.read_timestamp
+
+    def counting_read_timestamp(path: str) -> int:
+        read.append(path)
+        return read_timestamp(path)
+
+    monkeypatch.setattr(main, "read_timestamp", counting_read_timestamp)
+    first = window._get_existing_timestamps(paths)
+    assert sorted(read) == paths
+    read.clear()
+    assert window._get_existing_timestamps(paths) == first
+    assert read == []
+
+    os.utime(paths[1], (0, 0))
+    _ = window._get_existing_timestamps(paths)
+    assert read == [paths[1]]
+
+
+def test_export_checks_free_space(
+    app: W.QApplication,
+    merge_window: Any,
+    config_dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    target = os.path.join(config_dir, "export")
+    os.makedirs(target)
+    usage = shutil.disk_usage(target)
+    monkeypatch.setattr(
+        preflight.shutil,
+        "disk_usage",
+        lambda path: usage._replace(free=0),
+    )
+    problems: list[str] = []
+
+    def fill(widget: W.QWidget) -> None:
+        assert isinstance(widget, apply.ApplyDialog)
+        widget.target_directory_edit.setText(target)
+        widget.export_button.setChecked(True)
+        widget.merge_check_box.setChecked(False)
+        widget.accept()
+        problems.append(widget.problems_label.text())
+        widget.reject()
+
+    scalability.answer_modal(fill)
+    merge_window.apply()
+    assert "Not enough free space" in problems[0]
+    assert os.listdir(target) == []
+
+
+def test_preflight_reports_missing_files_without_hydrating(
+    app: W.QApplication,
+    merge_window: Any,
+    config_dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    target = os.path.join(config_dir, "copies")
+    missing = merge_window.to_model.item(1).filename
+    os.remove(missing)
+    hydrated: list[Any] = []
+    monkeypatch.setattr(main.ModelItem, "hydrate", hydrated.append)
+    problems: list[str] = []
+
+    def fill(widget: W.QWidget) -> None:
+        assert isinstance(widget, apply.ApplyDialog)
+        widget.target_directory_edit.setText(target)
+        widget.copy_button.setChecked(True)
+        widget.merge_check_box.setChecked(False)
+        widget.accept()
+        problems.append(widget.problems_label.text())
+        widget.reject()
+
+    scalability.answer_modal(fill)
+    merge_window.apply()
+    assert "Source files are missing (1)" in problems[0]
+    assert missing in problems[0]
+    assert hydrated == []
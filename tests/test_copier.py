@@ -0,0 +1,83 @@
+import datetime
+import os
+import types
+from typing import Any
+
+import pytest
+
+import copier
+
+
+def create_source(tmp_path: Any) -> str:
+    source = str(tmp_path / "source.jpg")
+    with open(source, "wb") as f:
+        _ = f.write(os.urandom(100000))
+    return source
+
+
+def test_verified_copy(tmp_path: Any) -> None:
+    source = create_source(tmp_path)
+    target_dir = tmp_path / "target"
+    target_dir.mkdir()
+    target = str(target_dir / "0001.jpg")
+    size, digest = copier.verified_copy(source, target)
+    assert size == 100000
+    assert digest == copier.hash_file(source) == copier.hash_file(target)
+    assert os.listdir(target_dir) == ["0001.jpg"]
+
+
+def test_corrupt_copy_leaves_nothing(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source = create_source(tmp_path)
+    target_dir = tmp_path / "target"
+    target_dir.mkdir()
+    monkeypatch.setattr(copier, "hash_file", lambda path: "corrupt")
+    with pytest.raises(copier.VerificationError):
+        _ = copier.verified_copy(source, str(target_dir / "0001.jpg"))
+    assert os.listdir(target_dir) == []
+
+
+def test_failed_copy_leaves_nothing(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source = create_source(tmp_path)
+    target_dir = tmp_path / "target"
+    target_dir.mkdir()
+
+    def fail(*args: Any) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(copier, "_drop_cache", fail)
+    with pytest.raises(OSError):
+        _ = copier.verified_copy(source, str(target_dir / "0001.jpg"))
+    assert os.listdir(target_dir) == []
+
+
+@pytest.mark.parametrize("frozen", [False, True])
+def test_manifests_do_not_overwrite_each_other(
+    tmp_path: Any, monkeypatch: pytest.MonkeyPatch, frozen: bool
+) -> None:
+    if frozen:
+        now = datetime.datetime(2024, 5, 6, 7, 8, 9, 123456)
+        monkeypatch.setattr(
+            copier,
+            "datetime",
+            types.SimpleNamespace(
+                datetime=types.SimpleNamespace(now=lambda: now)
+            ),
+        )
+    source = create_source(tmp_path)
+    paths = [
+        copier.write_manifest(str(tmp_path), [(source, i, "digest")])
+        for i in range(20)
+    ]
+    assert len(set(paths)) == 20
+    for i, path in enumerate(paths):
+        assert os.path.basename(path).startswith("manifest-")
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert lines == [
+            "path\tsize\t" + copier.hash_name,
+            "{}\t{}\tdigest".format(os.path.basename(source), i),
+        ]
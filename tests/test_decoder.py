@@ -0,0 +1,102 @@
+import os
+import time
+from typing import Any, cast, final, override
+
+import PyQt6.QtCore as C
+import PyQt6.QtGui as G
+import PyQt6.QtWidgets as W
+import pytest
+
+import decoder
+import thumbnails
+
+
+@final
+class Receiver(C.QObject):
+    def __init__(self) -> None:
+        super(Receiver, self).__init__()
+        self.decoder: decoder.Decoder | None = None
+
+    @override
+    def event(self, event: C.QEvent | None) -> bool:
+        assert event is not None
+        if cast(int, event.type()) == decoder.DecodedEvent.EventType:
+            assert self.decoder is not None
+            self.decoder.receive(cast(decoder.DecodedEvent, event))
+            return True
+        return super(Receiver, self).event(event)
+
+
+def create_image(path: str, width: int, height: int, seed: int) -> None:
+    image = G.QImage(width, height, G.QImage.Format.Format_RGB32)
+    for y in range(height):
+        for x in range(width):
+            image.setPixel(x, y, G.qRgb(x + seed, y, (x * y + seed) % 256))
+    assert image.save(path)
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_pool_matches_in_process_decoding(
+    app: W.QApplication, config_dir: str, shared: bool
+) -> None:
+    requests: list[tuple[str, int, int, int | None]] = []
+    for i, orientation in enumerate((None, 1, 3, 6, 8, 6)):
+        path = os.path.join(config_dir, "image{}.png".format(i))
+        create_image(path, 240 + i * 10, 160, i)
+        size = 64 if i < 3 else 100
+        requests.append((path, size, size + 20, orientation))
+
+    receiver = Receiver()
+    image_decoder = decoder.Decoder(receiver, 1)
+    receiver.decoder = image_decoder
+    results: dict[int, G.QImage] = {}
+    try:
+        for key, (path, size, load_size, orientation) in enumerate(requests):
+
+            def callback(image: G.QImage, key: int = key) -> None:
+                results[key] = image.copy()
+
+            image_decoder.request(
+                key, callback, path, size, load_size, orientation, shared
+            )
+        end = time.perf_counter() + 60.0
+        while not image_decoder.is_idle() and time.perf_counter() < end:
+            app.processEvents(C.QEventLoop.ProcessEventsFlag.AllEvents, 10)
+        assert image_decoder.is_idle()
+    finally:
+        image_decoder.shutdown()
+
+    assert sorted(results) == list(range(len(requests)))
+    for key, (path, size, load_size, orientation) in enumerate(requests):
+        expected = thumbnails.create(
+            path, size, load_size, orientation, shared
+        ).convertToFormat(decoder.image_format)
+        assert not expected.isNull()
+        assert results[key].size() == expected.size()
+        assert results[key] == expected
+
+
+def test_missing_file_is_not_delivered(
+    app: W.QApplication, config_dir: str
+) -> None:
+    receiver = Receiver()
+    image_decoder = decoder.Decoder(receiver, 1)
+    receiver.decoder = image_decoder
+    delivered: list[Any] = []
+    try:
+        image_decoder.request(
+            0,
+            delivered.append,
+            os.path.join(config_dir, "missing.png"),
+            64,
+            84,
+            None,
+            False,
+        )
+        end = time.perf_counter() + 60.0
+        while not image_decoder.is_idle() and time.perf_counter() < end:
+            app.processEvents(C.QEventLoop.ProcessEventsFlag.AllEvents, 10)
+        assert image_decoder.is_idle()
+    finally:
+        image_decoder.shutdown()
+    assert delivered == []
@@ -0,0 +1,173 @@
+from typing import Any
+
+import PyQt6.QtCore as C
+import PyQt6.QtGui as G
+import PyQt6.QtWidgets as W
+import pytest
+
+import delegate
+
+
+def create_delegate(picture_size: int = 64) -> delegate.ThumbnailDelegate:
+    result = delegate.ThumbnailDelegate()
+    result.set_picture_size(picture_size, W.QApplication.font())
+    return result
+
+
+def create_option(
+    rect: C.QRect, selected: bool = False
+) -> W.QStyleOptionViewItem:
+    option = W.QStyleOptionViewItem()
+    option.rect = rect
+    option.palette = W.QApplication.palette()
+    option.fontMetrics = G.QFontMetrics(W.QApplication.font())
+    if selected:
+        option.state = W.QStyle.StateFlag.State_Selected
+    return option
+
+
+def create_icon(color: str, size: int = 64) -> G.QIcon:
+    pixmap = G.QPixmap(size, size)
+    pixmap.fill(G.QColor(color))
+    return G.QIcon(pixmap)
+
+
+def paint(
+    thumbnail_delegate: delegate.ThumbnailDelegate,
+    item: G.QStandardItem,
+    selected: bool = False,
+) -> G.QImage:
+    model = G.QStandardItemModel()
+    model.appendRow(item)
+    size = thumbnail_delegate.get_grid_size()
+    image = G.QImage(size, G.QImage.Format.Format_RGB32)
+    image.fill(G.QColor("white"))
+    painter = G.QPainter(image)
+    thumbnail_delegate.paint(
+        painter,
+        create_option(C.QRect(C.QPoint(0, 0), size), selected),
+        model.index(0, 0),
+    )
+    _ = painter.end()
+    return image
+
+
+def test_size_follows_picture_size_and_font(app: W.QApplication) -> None:
+    thumbnail_delegate = create_delegate(64)
+    text_height = G.QFontMetrics(app.font()).height()
+    index = C.QModelIndex()
+    option = create_option(C.QRect())
+    assert thumbnail_delegate.sizeHint(option, index) == C.QSize(
+        64, 64 + text_height
+    )
+    assert thumbnail_delegate.get_grid_size() == C.QSize(
+        64 + delegate.separation, 64 + text_height + delegate.separation
+    )
+
+    font = G.QFont(app.font())
+    font.setPointSize(font.pointSize() * 3)
+    thumbnail_delegate.set_picture_size(100, font)
+    assert thumbnail_delegate.sizeHint(option, index) == C.QSize(
+        100, 100 + G.QFontMetrics(font).height()
+    )
+
+
+def test_texts_are_elided_and_cached(app: W.QApplication) -> None:
+    thumbnail_delegate = create_delegate(64)
+    font_metrics = G.QFontMetrics(app.font())
+    name = "a very long file name that does not fit.jpg"
+    static_text, width = thumbnail_delegate._get_text(name, font_metrics)
+    assert width <= 64
+    assert static_text.text() == font_metrics.elidedText(
+        name, C.Qt.TextElideMode.ElideRight, 64
+    )
+    assert thumbnail_delegate._get_text(name, font_metrics)[0] is static_text
+
+    thumbnail_delegate.set_picture_size(200, app.font())
+    assert thumbnail_delegate.texts == {}
+    static_text, width = thumbnail_delegate._get_text("a.jpg", font_metrics)
+    assert static_text.text() == "a.jpg"
+    assert width == font_metrics.horizontalAdvance("a.jpg")
+
+
+def test_text_cache_is_cleared_when_full(
+    app: W.QApplication, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(delegate, "max_texts", 3)
+    thumbnail_delegate = create_delegate()
+    font_metrics = G.QFontMetrics(app.font())
+    for i in range(3):
+        _ = thumbnail_delegate._get_text(str(i), font_metrics)
+    assert sorted(thumbnail_delegate.texts) == ["0", "1", "2"]
+    _ = thumbnail_delegate._get_text("1", font_metrics)
+    assert len(thumbnail_delegate.texts) == 3
+    _ = thumbnail_delegate._get_text("3", font_metrics)
+    assert list(thumbnail_delegate.texts) == ["3"]
+
+
+def test_pixmaps_are_cached_per_size_and_ratio(app: W.QApplication) -> None:
+    thumbnail_delegate = create_delegate(32)
+    icon = create_icon("red")
+    pixmap = thumbnail_delegate._get_pixmap(icon, 1.0)
+    assert pixmap.size() == C.QSize(32, 32)
+    key = thumbnail_delegate.get_cache_key(icon, 1.0)
+    cached = G.QPixmapCache.find(key)
+    assert cached is not None
+    assert cached.cacheKey() == pixmap.cacheKey()
+    assert thumbnail_delegate._get_pixmap(icon, 1.0).cacheKey() == (
+        pixmap.cacheKey()
+    )
+
+    assert thumbnail_delegate.get_cache_key(icon, 2.0) != key
+    thumbnail_delegate.set_picture_size(48, app.font())
+    assert thumbnail_delegate.get_cache_key(icon, 1.0) != key
+    assert thumbnail_delegate._get_pixmap(icon, 1.0).size() == C.QSize(48, 48)
+
+
+def test_paint_draws_icon_and_text(app: W.QApplication) -> None:
+    thumbnail_delegate = create_delegate(64)
+    item = G.QStandardItem(create_icon("red"), "name.jpg")
+    image = paint(thumbnail_delegate, item)
+    assert image.pixel(37, 32) == G.QColor("red").rgb()
+    assert image.pixel(1, 1) == G.QColor("white").rgb()
+    assert "name.jpg" in thumbnail_delegate.texts
+    text_row = [
+        image.pixel(x, 64 + thumbnail_delegate.text_height // 2)
+        for x in range(image.width())
+    ]
+    assert any(color != G.QColor("white").rgb() for color in text_row)
+
+
+def test_paint_draws_placeholder_without_icon(app: W.QApplication) -> None:
+    thumbnail_delegate = create_delegate(64)
+    image = paint(thumbnail_delegate, G.QStandardItem("name.jpg"))
+    midlight = app.palette().midlight().color()
+    assert image.pixel(37, 32) == midlight.rgb()
+    assert image.pixel(37, 2) == G.QColor("white").rgb()
+
+
+def test_paint_highlights_selection(app: W.QApplication) -> None:
+    thumbnail_delegate = create_delegate(64)
+    item = G.QStandardItem(create_icon("red"), "name.jpg")
+    image = paint(thumbnail_delegate, item, selected=True)
+    highlight = app.palette().highlight().color()
+    assert image.pixel(1, 1) == highlight.rgb()
+    assert image.pixel(37, 32) == G.QColor("red").rgb()
+
+
+def test_font_change_resizes_cells(window: Any) -> None:
+    view = window.from_list
+    thumbnail_delegate = view.itemDelegate()
+    _ = thumbnail_delegate._get_text("name.jpg", view.fontMetrics())
+    assert thumbnail_delegate.texts
+
+    font = G.QFont(view.font())
+    font.setPointSize(font.pointSize() * 3)
+    view.setFont(font)
+    text_height = G.QFontMetrics(font).height()
+    assert thumbnail_delegate.text_height == text_height
+    assert thumbnail_delegate.texts == {}
+    assert view.gridSize() == thumbnail_delegate.get_grid_size()
+    assert view.gridSize().height() == (
+        window.picture_size + text_height + delegate.separation
+    )
@@ -0,0 +1,58 @@
+import os
+from typing import Any
+
+import PyQt6.QtWidgets as W
+import pytest
+
+import config
+import diskorder
+import scalability
+
+
+def test_schedule_visits_every_path_once(tmp_path: Any) -> None:
+    paths = [str(tmp_path / "file{}".format(i)) for i in range(200)]
+    for path in paths:
+        with open(path, "wb") as f:
+            _ = f.write(os.urandom(100))
+    paths.append(str(tmp_path / "missing"))
+    order = list(diskorder.schedule(paths, lambda: None))
+    assert sorted(order) == list(range(len(paths)))
+
+
+def test_loaded_pictures_are_not_scheduled_again(
+    app: W.QApplication,
+    config_dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    config.config["progressive_thumbnails"] = False
+    window = scalability.create_window(app, 64, 60.0)
+    try:
+        scalability.create_tree(config_dir, 100)
+        window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+        window.load_pictures_task.run()
+        scalability.settle(app, window, 60.0)
+
+        keys: list[str] = []
+        prefetched: list[int] = []
+        get_key = diskorder.get_key
+        prefetch = diskorder.prefetch
+
+        def counting_get_key(path: str) -> tuple[int, int, int]:
+            keys.append(path)
+            return get_key(path)
+
+        def counting_prefetch(paths: list[str], length: int) -> None:
+            prefetched.append(length)
+            prefetch(paths, length)
+
+        monkeypatch.setattr(diskorder, "get_key", counting_get_key)
+        monkeypatch.setattr(diskorder, "prefetch", counting_prefetch)
+        scalability.select_rows(window.from_list, [(0, 4)])
+        window.add_items()
+        scalability.select_rows(window.to_list, [(2, 3)])
+        window.move_up()
+        scalability.settle(app, window, 60.0)
+        assert keys == []
+        assert all(length > 0 for length in prefetched)
+    finally:
+        scalability.close_window(app, window)
@@ -0,0 +1,121 @@
+import os
+import struct
+from typing import Any
+
+import PyQt6.QtGui as G
+import exifread
+import pytest
+
+import export
+
+
+def create_source(tmp_path: Any, width: int, height: int) -> str:
+    source = str(tmp_path / "source.jpg")
+    image = G.QImage(width, height, G.QImage.Format.Format_RGB32)
+    image.fill(G.QColor("red"))
+    assert image.save(source)
+    return source
+
+
+def test_failed_export_leaves_nothing(
+    app: Any, tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source = create_source(tmp_path, 64, 48)
+    target_dir = tmp_path / "target"
+    target_dir.mkdir()
+
+    def failing_replace(source: str, target: str) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        _ = export.export_image(source, str(target_dir / "0001.jpg"), 32, 85)
+    assert os.listdir(target_dir) == []
+
+
+def test_export_replaces_partial_file(app: Any, tmp_path: Any) -> None:
+    source = create_source(tmp_path, 64, 48)
+    target = str(tmp_path / "0001.jpg")
+    with open(target, "wb") as f:
+        _ = f.write(b"\xff\xd8truncated")
+    size = export.export_image(source, target, 32, 85)
+    assert os.path.getsize(target) == size
+    assert sorted(os.listdir(tmp_path)) == ["0001.jpg", "source.jpg"]
+    assert G.QImage(target).size().width() == 32
+
+
+def create_ifd(
+    entries: list[tuple[int, int, int, bytes]], offset: int
+) -> bytes:
+    data_offset = offset + 2 + 12 * len(entries) + 4
+    result = struct.pack(">H", len(entries))
+    data = b""
+    for tag, field_type, count, value in entries:
+        if len(value) <= 4:
+            field = value.ljust(4, b"\0")
+        else:
+            field = struct.pack(">I", data_offset + len(data))
+            data += value
+        result += struct.pack(">HHI", tag, field_type, count) + field
+    return result + struct.pack(">I", 0) + data
+
+
+def create_rotated_source(tmp_path: Any) -> str:
+    # Stored 64x48 with a red left and a blue right half, displayed rotated
+    # clockwise, so the red half is at the top.
+    image = G.QImage(64, 48, G.QImage.Format.Format_RGB32)
+    image.fill(G.QColor("blue"))
+    painter = G.QPainter(image)
+    painter.fillRect(0, 0, 32, 48, G.QColor("red"))
+    _ = painter.end()
+    plain = str(tmp_path / "plain.jpg")
+    assert image.save(plain, "JPG", 100)
+
+    date = b"2021:03:04 05:06:07\0"
+    exif = [
+        (0x9003, 2, len(date), date),
+        (0x9010, 2, 7, b"+02:00\0"),
+        (0x9291, 2, 4, b"042\0"),
+    ]
+    ifd0 = [
+        (0x0112, 3, 1, struct.pack(">H", 6)),
+        (0x0132, 2, len(date), date),
+        (0x8769, 4, 1, b"\0" * 4),
+    ]
+    exif_offset = 8 + len(create_ifd(ifd0, 8))
+    ifd0[-1] = (0x8769, 4, 1, struct.pack(">I", exif_offset))
+    tiff = b"MM\0*" + struct.pack(">I", 8) + create_ifd(ifd0, 8)
+    tiff += create_ifd(exif, len(tiff))
+    payload = b"Exif\0\0" + tiff
+    segment = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+    with open(plain, "rb") as f:
+        data = f.read()
+    source = str(tmp_path / "rotated.jpg")
+    with open(source, "wb") as f:
+        _ = f.write(data[:2] + segment + data[2:])
+    return source
+
+
+def test_export_keeps_dates_and_orients(app: Any, tmp_path: Any) -> None:
+    source = create_rotated_source(tmp_path)
+    target = str(tmp_path / "0001.jpg")
+    _ = export.export_image(source, target, 32, 95)
+
+    image = G.QImage(target)
+    assert (image.width(), image.height()) == (24, 32)
+    top = image.pixelColor(12, 4)
+    bottom = image.pixelColor(12, 28)
+    assert top.red() > 200 and top.blue() < 50
+    assert bottom.blue() > 200 and bottom.red() < 50
+
+    with open(target, "rb") as f:
+        tags = exifread.process_file(f, details=False)
+    values = {name: str(tag.values).strip() for name, tag in tags.items()}
+    assert values == {
+        "Image DateTime": "2021:03:04 05:06:07",
+        "Image ExifOffset": values["Image ExifOffset"],
+        "EXIF DateTimeOriginal": "2021:03:04 05:06:07",
+        "EXIF OffsetTime": "+02:00",
+        "EXIF SubSecTimeOriginal": "042",
+    }
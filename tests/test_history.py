@@ -0,0 +1,95 @@
+import os
+import random
+from typing import Any
+
+import pytest
+
+import scalability
+
+State = tuple[list[int], list[int]]
+
+
+def get_state(window: Any) -> State:
+    def get_ids(model: Any) -> list[int]:
+        return [model.item(row).get_index() for row in range(model.rowCount())]
+
+    return get_ids(window.from_model), get_ids(window.to_model)
+
+
+def get_random_ranges(rng: random.Random, count: int) -> list[tuple[int, int]]:
+    rows = sorted(rng.sample(range(count), rng.randint(1, min(count, 4))))
+    result: list[tuple[int, int]] = []
+    for row in rows:
+        if result and result[-1][1] + 1 >= row:
+            result[-1] = (result[-1][0], max(result[-1][1], row))
+        else:
+            result.append((row, row))
+    return result
+
+
+def run_random_command(window: Any, rng: random.Random) -> None:
+    from_count = window.from_model.rowCount()
+    to_count = window.to_model.rowCount()
+    action = rng.choice(["add", "add", "move_up", "move_down", "remove"])
+    if action == "add" or to_count == 0:
+        if from_count == 0:
+            return
+        scalability.select_rows(
+            window.to_list,
+            (
+                [(rng.randrange(to_count),) * 2]
+                if to_count and rng.random() < 0.5
+                else []
+            ),
+        )
+        scalability.select_rows(
+            window.from_list, get_random_ranges(rng, from_count)
+        )
+        window.add_items()
+        return
+    scalability.select_rows(window.to_list, get_random_ranges(rng, to_count))
+    getattr(window, action if action != "remove" else "remove_items")()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_undo_redo_round_trip(window: Any, config_dir: str, seed: int) -> None:
+    scalability.create_tree(config_dir, 60)
+    states = [get_state(window)]
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    states.append(get_state(window))
+    rng = random.Random(seed)
+    for _ in range(25):
+        run_random_command(window, rng)
+        state = get_state(window)
+        if state != states[-1]:
+            states.append(state)
+        if rng.random() < 0.3:
+            steps = rng.randint(1, len(states) - 1)
+            for state in reversed(states[-steps - 1 : -1]):
+                window.undo()
+                assert get_state(window) == state
+            for state in states[-steps:]:
+                window.redo()
+                assert get_state(window) == state
+
+    for state in reversed(states[:-1]):
+        window.undo()
+        assert get_state(window) == state
+    assert not window.history.can_undo()
+
+    for state in states[1:]:
+        window.redo()
+        assert get_state(window) == state
+    assert not window.history.can_redo()
+
+
+def test_take_removes_each_range_at_once(window: Any, config_dir: str) -> None:
+    scalability.create_tree(config_dir, 60)
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    removed: list[tuple[int, int]] = []
+    _ = window.from_model.rowsRemoved.connect(
+        lambda parent, first, last: removed.append((first, last))
+    )
+    scalability.select_rows(window.from_list, [(5, 19), (30, 59)])
+    window.add_items()
+    assert removed == [(30, 59), (5, 19)]
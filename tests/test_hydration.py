@@ -0,0 +1,133 @@
+import os
+import shutil
+from typing import Any
+
+import PyQt6.QtWidgets as W
+import pytest
+
+import config
+import main
+import scalability
+import timeline
+
+
+@pytest.mark.parametrize("progressive", [True, False])
+def test_search_index_sees_every_date(
+    app: W.QApplication, config_dir: str, progressive: bool
+) -> None:
+    config.config["progressive_thumbnails"] = progressive
+    window = scalability.create_window(app, 64, 60.0)
+    try:
+        scalability.create_tree(config_dir, 300)
+        window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+        window.load_pictures_task.run()
+        scalability.settle(app, window, 60.0)
+        window.update_timeline()
+
+        timestamps = window._get_search_index().timestamps
+        assert len(timestamps) == 300
+        assert timeline.missing not in timestamps
+        assert int(window.timeline.counts.sum()) == 300
+    finally:
+        scalability.close_window(app, window)
+
+
+def test_date_sort_hydrates_before_comparing(
+    window: Any, config_dir: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    scalability.create_tree(config_dir, 100)
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+
+    sorting = False
+    hydrated_while_sorting: list[str] = []
+    hydrate = main.ModelItem.hydrate
+
+    def checked_hydrate(item: main.ModelItem) -> None:
+        if sorting and not item.is_hydrated():
+            hydrated_while_sorting.append(item.filename)
+        hydrate(item)
+
+    sort = window.from_model.sort
+
+    def checked_sort(*args: Any) -> None:
+        nonlocal sorting
+        sorting = True
+        try:
+            sort(*args)
+        finally:
+            sorting = False
+
+    monkeypatch.setattr(main.ModelItem, "hydrate", checked_hydrate)
+    window.from_model.sort = checked_sort
+    window.set_sort("date")
+    assert hydrated_while_sorting == []
+    assert all(item.is_hydrated() for item in window._get_all_items())
+
+
+def test_loading_hydrates_only_new_items(
+    app: W.QApplication,
+    window: Any,
+    config_dir: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    scalability.create_tree(config_dir, 50)
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    assert window.hydration_pending
+    window.load_pictures_task.run()
+    scalability.settle(app, window, 60.0)
+    assert not window.hydration_pending
+    assert all(item.is_hydrated() for item in window._get_all_items())
+
+    def fail(*args: Any) -> None:
+        pytest.fail("nothing is left to hydrate")
+
+    monkeypatch.setattr(window, "_hydrate_items", fail)
+    monkeypatch.setattr(main.ModelItem, "is_hydrated", fail)
+    window.load_pictures_task.run()
+    scalability.settle(app, window, 60.0)
+
+
+def test_added_directory_is_appended(window: Any, config_dir: str) -> None:
+    scalability.create_tree(config_dir, 10)
+    window.set_sort("name")
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    extra = os.path.join(config_dir, "extra")
+    os.makedirs(extra)
+    shutil.copy(
+        os.path.join(config_dir, "template0.jpg"),
+        os.path.join(extra, "AAA.jpg"),
+    )
+    window.history.checkpoint()
+    window._add_dir(extra, recursive=False)
+
+    def get_names() -> list[str]:
+        model = window.from_model
+        return [model.item(row).text() for row in range(model.rowCount())]
+
+    names = get_names()
+    assert len(names) == 11
+    assert names[-1] == "AAA.jpg"
+    window.undo()
+    assert get_names() == names[:-1]
+    window.redo()
+    assert get_names() == names
+
+
+def test_visible_rows_during_batched_layout(
+    app: W.QApplication, window: Any, config_dir: str
+) -> None:
+    scalability.create_tree(config_dir, 200)
+    view = window.from_list
+    view.setBatchSize(10)
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    view.doItemsLayout()
+    model = view.model()
+    assert not view.visualRect(model.index(10, 0)).isValid()
+    assert window._get_visible_rows(view) == range(10)
+
+    scalability.settle(app, window, 60.0)
+    rows = window._get_visible_rows(view)
+    assert rows.start == 0 and 10 < rows.stop < 200
+    height = view.viewport().height()
+    assert view.visualRect(model.index(rows.stop - 1, 0)).top() <= height
+    assert view.visualRect(model.index(rows.stop, 0)).top() > height
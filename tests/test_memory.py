@@ -0,0 +1,55 @@
+import os
+
+import PyQt6.QtWidgets as W
+import pytest
+
+import scalability
+
+
+@pytest.fixture
+def memory_results(
+    app: W.QApplication, config_dir: str
+) -> list[scalability.MemoryResult]:
+    scalability.create_tree(config_dir, 1000)
+    metadata, pixmaps = scalability.measure_memory(
+        app, os.path.join(config_dir, "tree"), 1000, [64, 128, 256], 60.0
+    )
+    return [metadata] + pixmaps
+
+
+def test_metadata_bytes_per_item(
+    memory_results: list[scalability.MemoryResult],
+) -> None:
+    metadata = memory_results[0]
+    assert metadata.loaded == 1000
+    assert scalability.check_memory(
+        [metadata],
+        scalability.default_metadata_ceiling,
+        scalability.default_pixmap_ceiling,
+    ), metadata.failures
+
+
+def test_pixmap_bytes_per_item(
+    memory_results: list[scalability.MemoryResult],
+) -> None:
+    pixmaps = memory_results[1:]
+    assert all(result.loaded != 0 for result in pixmaps)
+    assert scalability.check_memory(
+        pixmaps,
+        scalability.default_metadata_ceiling,
+        scalability.default_pixmap_ceiling,
+    ), [result.failures for result in pixmaps]
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/statm"), reason="needs /proc"
+)
+def test_rss_is_current() -> None:
+    size = 64 * 2**20
+    before = scalability.get_rss()
+    data = bytearray(os.urandom(1024)) * (size // 1024)
+    during = scalability.get_rss()
+    assert during - before >= size // 2
+    del data
+    # Unlike the peak of the process, the current RSS drops again.
+    assert scalability.get_rss() < during - size // 2
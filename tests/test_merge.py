@@ -0,0 +1,172 @@
+import itertools
+import random
+
+import pytest
+
+import merge
+
+
+def get_max_kept(
+    existing_numbers: list[int],
+    existing_timestamps: list[int],
+    new_timestamps: list[int],
+    base: int,
+) -> int:
+    order = merge._merge(existing_timestamps, new_timestamps)
+    positions = {
+        id: position
+        for position, (is_existing, id) in enumerate(order)
+        if is_existing
+    }
+    ids = sorted(positions, key=positions.__getitem__)
+    for count in range(len(ids), 0, -1):
+        for kept in itertools.combinations(ids, count):
+            number, position = base - 1, -1
+            for id in kept:
+                gap = existing_numbers[id] - number
+                if gap < positions[id] - position:
+                    break
+                number, position = existing_numbers[id], positions[id]
+            else:
+                return count
+    return 0
+
+
+@pytest.mark.parametrize(
+    "existing_numbers, existing_timestamps, new_timestamps, base, expected",
+    [
+        # Appending after the last file renames nothing.
+        ([1, 2, 3], [10, 20, 30], [40], 1, ([1, 2, 3], [4])),
+        # A gap in the numbering takes the new file.
+        ([1, 5, 6], [10, 20, 30], [15], 1, ([1, 5, 6], [2])),
+        # Without room before them, all of the later files move.
+        ([1, 2, 3], [10, 20, 30], [5], 1, ([2, 3, 4], [1])),
+        # The existing files keep their order even if their dates do not.
+        ([1, 2, 3], [10, 30, 20], [25], 1, ([1, 3, 4], [2])),
+        # Equal dates keep the existing file first.
+        ([1, 3], [10, 20], [10, 20], 1, ([1, 3], [2, 4])),
+        # Numbering starts at the base.
+        ([], [], [20, 10], 7, ([], [8, 7])),
+    ],
+)
+def test_plan_merge(
+    existing_numbers: list[int],
+    existing_timestamps: list[int],
+    new_timestamps: list[int],
+    base: int,
+    expected: tuple[list[int], list[int]],
+) -> None:
+    result = merge.plan_merge(
+        existing_numbers, existing_timestamps, new_timestamps, base
+    )
+    assert result == expected
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_plan_merge_is_ordered_and_minimal(seed: int) -> None:
+    rng = random.Random(seed)
+    count = rng.randint(0, 7)
+    existing_numbers = sorted(rng.sample(range(1, 20), count))
+    existing_timestamps = sorted(rng.randint(0, 10) for _ in range(count))
+    new_timestamps = [rng.randint(0, 10) for _ in range(rng.randint(0, 5))]
+    base = min([rng.randint(1, 5)] + existing_numbers[:1])
+
+    existing, new = merge.plan_merge(
+        existing_numbers, existing_timestamps, new_timestamps, base
+    )
+    numbers = existing + new
+    assert len(set(numbers)) == len(numbers)
+    assert all(number >= base for number in numbers)
+    timestamps = existing_timestamps + new_timestamps
+    ordered = [
+        timestamps[i]
+        for i in sorted(range(len(numbers)), key=numbers.__getitem__)
+    ]
+    assert ordered == sorted(ordered)
+
+    kept = sum(1 for a, b in zip(existing_numbers, existing) if a == b)
+    assert kept == get_max_kept(
+        existing_numbers, existing_timestamps, new_timestamps, base
+    )
+
+
+def simulate(
+    renames: list[tuple[str, str]], files: dict[str, str]
+) -> dict[str, str]:
+    files = dict(files)
+    for source, target in renames:
+        assert source in files
+        assert target not in files, "{} would be overwritten".format(target)
+        files[target] = files.pop(source)
+    return files
+
+
+def check_renames(
+    renames: list[tuple[str, str]], taken: set[str], expected_count: int
+) -> list[tuple[str, str]]:
+    files = {name: "content of " + name for name in taken}
+    files.update({source: "content of " + source for source, _ in renames})
+    ordered = merge.order_renames(renames, set(files))
+    result = simulate(ordered, files)
+    expected = dict(files)
+    for source, _ in renames:
+        del expected[source]
+    for source, target in renames:
+        expected[target] = files[source]
+    assert result == expected
+    assert len(ordered) == expected_count
+    return ordered
+
+
+def test_order_renames_chain() -> None:
+    ordered = check_renames([("a", "b"), ("b", "c"), ("c", "d")], set(), 3)
+    assert ordered == [("c", "d"), ("b", "c"), ("a", "b")]
+
+
+def test_order_renames_skips_unchanged() -> None:
+    _ = check_renames([("a", "a"), ("b", "c")], set(), 1)
+
+
+def test_order_renames_cycle() -> None:
+    ordered = check_renames([("a", "b"), ("b", "c"), ("c", "a")], set(), 4)
+    temporaries = {target for _, target in ordered} - {"a", "b", "c"}
+    assert len(temporaries) == 1
+
+
+def test_order_renames_avoids_taken_temporary_names() -> None:
+    ordered = check_renames(
+        [("a", "b"), ("b", "a")], {".a.merge0", ".b.merge0"}, 3
+    )
+    temporaries = {target for _, target in ordered} - {"a", "b"}
+    assert temporaries.isdisjoint({".a.merge0", ".b.merge0"})
+
+
+def count_cycles(renames: list[tuple[str, str]]) -> int:
+    mapping = {source: target for source, target in renames if source != target}
+    result = 0
+    seen: set[str] = set()
+    for start in mapping:
+        if start in seen:
+            continue
+        name = start
+        while name in mapping and name not in seen:
+            seen.add(name)
+            name = mapping[name]
+        result += name == start
+    return result
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_order_renames_random(seed: int) -> None:
+    rng = random.Random(seed)
+    names = ["{:04}.jpg".format(i) for i in range(rng.randint(1, 12))]
+    sources = rng.sample(names, rng.randint(1, len(names)))
+    free = ["{:04}.jpg".format(i) for i in range(100, 105)]
+    targets = rng.sample(sources + free, len(sources))
+    renames = list(zip(sources, targets))
+    changed = sum(1 for source, target in renames if source != target)
+    _ = check_renames(
+        renames,
+        set(names) - set(sources),
+        changed + count_cycles(renames),
+    )
@@ -0,0 +1,143 @@
+import os
+import PyQt6.QtCore as C
+import PyQt6.QtGui as G
+import PyQt6.QtWidgets as W
+import random
+import shutil
+from typing import Any
+
+import scalability
+import search
+
+
+def create_model(names: list[str]) -> G.QStandardItemModel:
+    model = G.QStandardItemModel()
+    for name in names:
+        model.appendRow([G.QStandardItem(name)])
+    return model
+
+
+def get_mapped(filter_model: search.FilterModel) -> list[str]:
+    return [
+        filter_model.data(filter_model.index(row, 0))
+        for row in range(filter_model.rowCount())
+    ]
+
+
+def test_inserts_and_removals_do_not_reset() -> None:
+    model = create_model(["a{}".format(i) for i in range(20)])
+    filter_model = search.FilterModel(model)
+    matches_name = search.get_name_matcher("*[05]")
+
+    def accepts(row: int) -> bool:
+        item = model.item(row)
+        assert item is not None
+        return matches_name(item.text())
+
+    filter_model.set_rows(
+        [row for row in range(model.rowCount()) if accepts(row)], accepts
+    )
+    resets: list[int] = []
+    inserts: list[int] = []
+    _ = filter_model.modelReset.connect(lambda: resets.append(0))
+    _ = filter_model.source_changed.connect(lambda: resets.append(0))
+    _ = filter_model.rowsInserted.connect(lambda *args: inserts.append(0))
+
+    rng = random.Random(0)
+    number = 20
+    for _ in range(200):
+        if rng.random() < 0.5 or model.rowCount() < 5:
+            row = rng.randint(0, model.rowCount())
+            count = rng.randint(1, 3)
+            root = model.invisibleRootItem()
+            assert root is not None
+            root.insertRows(
+                row,
+                [
+                    G.QStandardItem("a{}".format(number + i))
+                    for i in range(count)
+                ],
+            )
+            number += count
+        else:
+            row = rng.randrange(model.rowCount() - 2)
+            _ = model.removeRows(row, rng.randint(1, 2))
+        names = [
+            model.data(model.index(row, 0)) for row in range(model.rowCount())
+        ]
+        assert get_mapped(filter_model) == [
+            name for name in names if matches_name(name)
+        ]
+        for proxy_row, source_row in enumerate(filter_model.rows):
+            assert filter_model.inverse[source_row] == proxy_row
+        assert len(filter_model.inverse) == len(filter_model.rows)
+
+    assert resets == []
+    assert inserts
+
+
+def test_appending_rows_keeps_mapping() -> None:
+    model = create_model(["a", "b", "c"])
+    filter_model = search.FilterModel(model)
+    filter_model.set_rows([0, 2])
+    for name in ("d", "e"):
+        model.appendRow([G.QStandardItem(name)])
+    assert get_mapped(filter_model) == ["a", "c"]
+    source = filter_model.mapToSource(filter_model.index(1, 0))
+    assert source.row() == 2
+    assert filter_model.mapFromSource(model.index(1, 0)) == C.QModelIndex()
+
+
+def test_adding_files_keeps_filtered_view(
+    app: W.QApplication, window: Any, config_dir: str
+) -> None:
+    scalability.create_tree(config_dir, 100)
+    tree = os.path.join(config_dir, "tree")
+    other = os.path.join(config_dir, "other")
+    os.makedirs(other)
+    for name in sorted(os.listdir(os.path.join(tree, "dir0000")))[50:]:
+        shutil.move(os.path.join(tree, "dir0000", name), other)
+    window._add_dir(tree, recursive=True)
+    window.filter_edit.setText("5")
+    window.update_filter()
+    filter_model = window.filter_model
+    count = filter_model.rowCount()
+    scalability.select_rows(window.from_list, [(1, 1)])
+    selected = window.from_list.selectionModel().selectedIndexes()[0].data()
+
+    resets: list[int] = []
+    _ = filter_model.modelReset.connect(lambda: resets.append(0))
+    window._add_dir(other, recursive=True)
+    scalability.settle(app, window, 60.0)
+
+    names = [
+        window.from_model.item(row).text()
+        for row in range(window.from_model.rowCount())
+    ]
+    assert get_mapped(filter_model) == [name for name in names if "5" in name]
+    assert filter_model.rowCount() > count
+    assert resets == []
+    indexes = window.from_list.selectionModel().selectedIndexes()
+    assert [index.data() for index in indexes] == [selected]
+
+
+def test_add_items_selects_next_filtered_row(
+    window: Any, config_dir: str
+) -> None:
+    scalability.create_tree(config_dir, 100)
+    window._add_dir(os.path.join(config_dir, "tree"), recursive=True)
+    window.filter_edit.setText("5")
+    window.update_filter()
+    filter_model = window.filter_model
+    assert window.from_list.model() is filter_model
+    assert 5 <= filter_model.rowCount() < window.from_model.rowCount()
+
+    names = get_mapped(filter_model)
+    scalability.select_rows(window.from_list, [(1, 2)])
+    window.add_items()
+
+    assert get_mapped(filter_model) == names[:1] + names[3:]
+    current = window.from_list.currentIndex()
+    assert current.model() is filter_model
+    assert current.row() == 1
+    assert current.data() == names[3]
@@ -0,0 +1,64 @@
+import hashlib
+import os
+from typing import Any
+
+import PyQt6.QtGui as G
+import PyQt6.QtWidgets as W
+
+import thumbnails
+
+
+def test_uri_escapes_like_glib() -> None:
+    assert (
+        thumbnails.get_uri("/photos/IMG_1234 (1).jpg")
+        == "file:///photos/IMG_1234%20(1).jpg"
+    )
+    assert (
+        thumbnails.get_uri("/photos/a'b&c+d!e*f,g=h:i@j~k.jpg")
+        == "file:///photos/a'b&c+d!e*f,g=h:i@j~k.jpg"
+    )
+    assert (
+        thumbnails.get_uri("/photos/50%#?ä.jpg")
+        == "file:///photos/50%25%23%3F%C3%A4.jpg"
+    )
+
+
+def test_thumbnail_name_is_hash_of_uri() -> None:
+    uri = "file:///photos/IMG_1234%20(1).jpg"
+    assert (
+        thumbnails.get_thumbnail_name("/photos/IMG_1234 (1).jpg")
+        == hashlib.md5(uri.encode("utf-8")).hexdigest() + ".png"
+    )
+
+
+def test_saved_thumbnail_is_found(
+    app: W.QApplication, config_dir: str, tmp_path: Any
+) -> None:
+    filename = str(tmp_path / "IMG_1234 (1) & more.jpg")
+    image = G.QImage(300, 200, G.QImage.Format.Format_RGB32)
+    image.fill(G.QColor("red"))
+    assert image.save(filename)
+
+    thumbnails.save(filename, thumbnails.scale(image, 128))
+    path = os.path.join(
+        thumbnails.get_cache_dir(),
+        "normal",
+        thumbnails.get_thumbnail_name(filename),
+    )
+    assert os.path.exists(path)
+    loaded = thumbnails.load(filename, 128)
+    assert loaded is not None
+    assert loaded.text("Thumb::URI") == thumbnails.get_uri(filename)
+
+
+def test_orient_handles_images_and_pixmaps(app: W.QApplication) -> None:
+    image = G.QImage(30, 20, G.QImage.Format.Format_RGB32)
+    assert (
+        thumbnails.orient(image, 6).size()
+        == G.QImage(20, 30, image.format()).size()
+    )
+    pixmap = G.QPixmap(30, 20)
+    rotated = thumbnails.orient(pixmap, 8)
+    assert isinstance(rotated, G.QPixmap)
+    assert (rotated.width(), rotated.height()) == (20, 30)
+    assert thumbnails.orient(pixmap, None) is pixmap
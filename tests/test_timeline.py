@@ -0,0 +1,124 @@
+import datetime
+
+import pytest
+
+import timeline
+
+utc = datetime.timezone.utc
+
+
+def get_timestamp(
+    year: int,
+    month: int,
+    day: int,
+    hour: int = 0,
+    minute: int = 0,
+    second: int = 0,
+    microsecond: int = 0,
+    *,
+    tz: datetime.tzinfo | None = None,
+) -> int:
+    value = datetime.datetime(
+        year, month, day, hour, minute, second, microsecond, tz
+    )
+    return int(value.timestamp()) * timeline.microseconds + value.microsecond
+
+
+def get_offset(hours: int, minutes: int = 0) -> datetime.timezone:
+    return datetime.timezone(datetime.timedelta(hours=hours, minutes=minutes))
+
+
+@pytest.mark.parametrize(
+    "date,subsec,expected",
+    [
+        ("2021:03:04 05:06:07", None, (2021, 3, 4, 5, 6, 7)),
+        ("2021-03-04T05:06:07", None, (2021, 3, 4, 5, 6, 7)),
+        (" 2021:03:04 05:06:07 ", None, (2021, 3, 4, 5, 6, 7)),
+        ("2021:03:04 05:06:07", "5", (2021, 3, 4, 5, 6, 7, 500000)),
+        ("2021:03:04 05:06:07", "042", (2021, 3, 4, 5, 6, 7, 42000)),
+        ("2021:03:04 05:06:07", "12345678", (2021, 3, 4, 5, 6, 7, 123456)),
+        ("2021:03:04 05:06:07", " 25 ", (2021, 3, 4, 5, 6, 7, 250000)),
+        ("2021:03:04 05:06:07", "", (2021, 3, 4, 5, 6, 7)),
+        ("2021:03:04 05:06:07.25", "9", (2021, 3, 4, 5, 6, 7, 250000)),
+    ],
+)
+def test_parse_exif_date_local(
+    date: str, subsec: str | None, expected: tuple[int, ...]
+) -> None:
+    assert timeline.parse_exif_date(date, subsec) == get_timestamp(*expected)
+
+
+@pytest.mark.parametrize(
+    "subsec,offset,tz,microsecond",
+    [
+        (None, "+00:00", utc, 0),
+        (None, "+02:00", get_offset(2), 0),
+        (None, "-05:00", get_offset(-5), 0),
+        (None, "+0530", get_offset(5, 30), 0),
+        (None, " -09:30 ", get_offset(-9, -30), 0),
+        ("75", "+01:00", get_offset(1), 750000),
+        (None, "   :  ", None, 0),
+        (None, "02:00", None, 0),
+        (None, "", None, 0),
+    ],
+)
+def test_parse_exif_date_offset(
+    subsec: str | None,
+    offset: str,
+    tz: datetime.timezone | None,
+    microsecond: int,
+) -> None:
+    expected = get_timestamp(2021, 3, 4, 5, 6, 7, microsecond, tz=tz)
+    assert (
+        timeline.parse_exif_date("2021:03:04 05:06:07", subsec, offset)
+        == expected
+    )
+
+
+@pytest.mark.parametrize(
+    "date",
+    [
+        "",
+        "    :  :     :  :  ",
+        "0000:00:00 00:00:00",
+        "2021:13:04 05:06:07",
+        "2021:02:30 05:06:07",
+        "2021:03:04 25:06:07",
+        "2021:03:04",
+        "2021:03:04 05:06",
+        "2021/03/04 05:06:07",
+    ],
+)
+def test_parse_exif_date_invalid(date: str) -> None:
+    assert timeline.parse_exif_date(date, "123", "+01:00") is None
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        ("IMG_20210304_050607.jpg", (2021, 3, 4, 5, 6, 7)),
+        ("IMG_20210304_050607_123.jpg", (2021, 3, 4, 5, 6, 7, 123000)),
+        ("PXL_20210304_050607123.jpg", (2021, 3, 4, 5, 6, 7, 123000)),
+        ("20210304-050607.5.jpg", (2021, 3, 4, 5, 6, 7, 500000)),
+        ("2021-03-04 05.06.07.jpg", (2021, 3, 4, 5, 6, 7)),
+        ("2021-03-04T05:06:07.jpg", (2021, 3, 4, 5, 6, 7)),
+        ("Screenshot_2021-03-04-05-06-07.png", (2021, 3, 4, 5, 6, 7)),
+        ("VID_20210304_050607_1234567.mp4", (2021, 3, 4, 5, 6, 7)),
+        ("2021-03-04.jpg", (2021, 3, 4)),
+        ("scan 20210304.jpg", (2021, 3, 4)),
+        ("IMG_20210304_050607+0200.jpg", (2021, 3, 4, 5, 6, 7)),
+        ("IMG_20210304_050607Z.jpg", (2021, 3, 4, 5, 6, 7)),
+        ("20211304_050607 2021-03-04.jpg", (2021, 3, 4)),
+        ("20210304_256007.jpg", (2021, 3, 4)),
+        ("18000304_050607 20210304.jpg", (2021, 3, 4)),
+        ("00120210304_050607.jpg", None),
+        ("IMG_1234.jpg", None),
+        ("photo.jpg", None),
+    ],
+)
+def test_parse_filename(
+    filename: str, expected: tuple[int, ...] | None
+) -> None:
+    assert timeline.parse_filename(filename) == (
+        None if expected is None else get_timestamp(*expected)
+    )
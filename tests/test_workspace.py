@@ -0,0 +1,17 @@
+from typing import Any
+
+import config
+import workspace
+
+
+def test_new_workspace_starts_from_defaults(window: Any) -> None:
+    config.config["prefix"] = "old"
+    config.config["export_quality"] = 50
+    window.switch_workspace("Other")
+    assert "prefix" not in config.config
+    assert "export_quality" not in config.config
+
+    config.config["prefix"] = "other"
+    window.switch_workspace(workspace.default_name)
+    assert config.config["prefix"] == "old"
+    assert config.config["export_quality"] == 50
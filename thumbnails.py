@@ -0,0 +1,157 @@
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+import hashlib
+import os
+import tempfile
+import traceback
+import urllib.parse
+from typing import TypeVar
+
+orientations: dict[int, G.QTransform] = {
+    2: G.QTransform(-1, 0, 0, 1, 0, 0),
+    3: G.QTransform(-1, 0, 0, -1, 0, 0),
+    4: G.QTransform(1, 0, 0, -1, 0, 0),
+    5: G.QTransform(0, 1, 1, 0, 0, 0),
+    6: G.QTransform(0, 1, -1, 0, 0, 0),
+    7: G.QTransform(0, -1, -1, 0, 0, 0),
+    8: G.QTransform(0, -1, 1, 0, 0, 0),
+}
+
+buckets: list[tuple[str, int]] = [
+    ("normal", 128),
+    ("large", 256),
+    ("x-large", 512),
+    ("xx-large", 1024),
+]
+
+software = "Photo Organizer"
+
+
+Image = TypeVar("Image", G.QImage, G.QPixmap)
+
+
+def orient(image: Image, orientation: int | None) -> Image:
+    if orientation is not None:
+        transform = orientations.get(orientation)
+        if transform is not None:
+            return image.transformed(transform)
+    return image
+
+
+def get_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "thumbnails")
+
+
+def get_uri(filename: str) -> str:
+    # Escape the same characters as g_filename_to_uri, other programs look
+    # up the thumbnails by the hash of this exact string.
+    return "file://" + urllib.parse.quote(
+        os.path.abspath(filename), safe="/!$&'()*+,;=:@~"
+    )
+
+
+def get_thumbnail_name(filename: str) -> str:
+    digest = hashlib.md5(get_uri(filename).encode("utf-8")).hexdigest()
+    return digest + ".png"
+
+
+def _get_buckets(size: int) -> list[tuple[str, int]]:
+    return [bucket for bucket in buckets if bucket[1] >= size]
+
+
+def _is_valid(image: G.QImage, uri: str, stat: os.stat_result) -> bool:
+    if image.text("Thumb::URI") != uri:
+        return False
+    if image.text("Thumb::MTime") != str(int(stat.st_mtime)):
+        return False
+    file_size = image.text("Thumb::Size")
+    return not file_size or file_size == str(stat.st_size)
+
+
+def load(filename: str, size: int) -> G.QImage | None:
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    uri = get_uri(filename)
+    name = get_thumbnail_name(filename)
+    cache_dir = get_cache_dir()
+    for directory, _ in _get_buckets(size):
+        path = os.path.join(cache_dir, directory, name)
+        if not os.path.exists(path):
+            continue
+        image = G.QImage(path)
+        if not image.isNull() and _is_valid(image, uri, stat):
+            return image
+    return None
+
+
+def save(filename: str, image: G.QImage) -> None:
+    available = _get_buckets(max(image.width(), image.height()))
+    if not available:
+        return
+    directory = available[0][0]
+    try:
+        stat = os.stat(filename)
+        target_dir = os.path.join(get_cache_dir(), directory)
+        os.makedirs(target_dir, mode=0o700, exist_ok=True)
+
+        image = G.QImage(image)
+        image.setText("Thumb::URI", get_uri(filename))
+        image.setText("Thumb::MTime", str(int(stat.st_mtime)))
+        image.setText("Thumb::Size", str(stat.st_size))
+        image.setText("Software", software)
+
+        fd, temp_path = tempfile.mkstemp(suffix=".png", dir=target_dir)
+        os.close(fd)
+        try:
+            if not image.save(temp_path, "PNG"):
+                raise OSError("Failed to write " + temp_path)
+            os.replace(
+                temp_path,
+                os.path.join(target_dir, get_thumbnail_name(filename)),
+            )
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except Exception:
+        traceback.print_exc()
+
+
+def scale(image: G.QImage, size: int) -> G.QImage:
+    if image.width() <= size and image.height() <= size:
+        return image
+    return image.scaled(
+        size,
+        size,
+        C.Qt.AspectRatioMode.KeepAspectRatio,
+        C.Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+def create(
+    filename: str,
+    size: int,
+    load_size: int,
+    orientation: int | None,
+    shared: bool,
+) -> G.QImage:
+    available = _get_buckets(size) if shared else []
+    if available:
+        cached = load(filename, size)
+        if cached is not None:
+            return scale(cached, load_size)
+
+    image = G.QImage(filename)
+    if image.isNull() or not available:
+        return orient(scale(image, load_size), orientation)
+
+    bucket_size = available[0][1]
+    is_larger = image.width() > bucket_size or image.height() > bucket_size
+    image = orient(scale(image, bucket_size), orientation)
+    if is_larger:
+        save(filename, image)
+    return scale(image, load_size)
@@ -0,0 +1,273 @@
+import PyQt6.QtWidgets as W
+import PyQt6.QtGui as G
+import PyQt6.QtCore as C
+import array
+import datetime
+import numpy as np
+import re
+from typing import final, override
+
+missing = -(2**63)
+microseconds = 1_000_000
+
+filename_patterns = [
+    re.compile(
+        r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})[-_ T.]?"
+        r"(\d{2})[-_:.]?(\d{2})[-_:.]?(\d{2})(?:[-_.]?(\d{1,6}))?(?!\d)"
+    ),
+    re.compile(r"(?<!\d)(\d{4})-?(\d{2})-?(\d{2})(?!\d)"),
+]
+
+
+def _to_timestamp(value: datetime.datetime) -> int:
+    if value.tzinfo is None:
+        value = value.astimezone()
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    delta = value - epoch
+    return (delta.days * 86400 + delta.seconds) * microseconds + (
+        delta.microseconds
+    )
+
+
+def _get_microseconds(fraction: str | None) -> int:
+    if not fraction:
+        return 0
+    return int(fraction[:6].ljust(6, "0"))
+
+
+def _get_timezone(offset: str | None) -> datetime.timezone | None:
+    if not offset:
+        return None
+    match = re.fullmatch(r"\s*([+-])(\d{2}):?(\d{2})\s*", offset)
+    if match is None:
+        return None
+    sign = -1 if match.group(1) == "-" else 1
+    return datetime.timezone(
+        sign
+        * datetime.timedelta(
+            hours=int(match.group(2)), minutes=int(match.group(3))
+        )
+    )
+
+
+def parse_exif_date(
+    date: str, subsec: str | None = None, offset: str | None = None
+) -> int | None:
+    match = re.fullmatch(
+        r"\s*(\d{4})[:-](\d{2})[:-](\d{2})[ T](\d{2}):(\d{2}):(\d{2})"
+        r"(?:\.(\d+))?\s*",
+        date,
+    )
+    if match is None:
+        return None
+    fraction = match.group(7) or (subsec.strip() if subsec else None)
+    year, month, day, hour, minute, second = (
+        int(match.group(i)) for i in range(1, 7)
+    )
+    try:
+        value = datetime.datetime(
+            year,
+            month,
+            day,
+            hour,
+            minute,
+            second,
+            _get_microseconds(fraction),
+            _get_timezone(offset),
+        )
+    except ValueError:
+        return None
+    return _to_timestamp(value)
+
+
+def parse_filename(filename: str) -> int | None:
+    for pattern in filename_patterns:
+        for match in pattern.finditer(filename):
+            groups = match.groups()
+            year, month, day, hour, minute, second = (
+                int(group) if group is not None else 0
+                for group in (groups + (None,) * 6)[:6]
+            )
+            try:
+                value = datetime.datetime(
+                    year, month, day, hour, minute, second
+                )
+            except ValueError:
+                continue
+            if not 1900 <= value.year <= 2200:
+                continue
+            if len(groups) > 6:
+                value = value.replace(microsecond=_get_microseconds(groups[6]))
+            return _to_timestamp(value)
+    return None
+
+
+def from_mtime(mtime: float) -> int:
+    return int(mtime * microseconds)
+
+
+def to_datetime(timestamp: int) -> C.QDateTime:
+    return C.QDateTime.fromMSecsSinceEpoch(timestamp // 1000)
+
+
+def from_datetime(value: C.QDateTime) -> int:
+    return value.toMSecsSinceEpoch() * 1000
+
+
+@final
+class Timestamps:
+    def __init__(self) -> None:
+        self.values = array.array("q")
+
+    def set(self, index: int, timestamp: int) -> None:
+        if index >= len(self.values):
+            self.values.extend([missing] * (index + 1 - len(self.values)))
+        self.values[index] = timestamp
+
+    def get(self, index: int) -> int:
+        return self.values[index] if index < len(self.values) else missing
+
+
+def get_ranges(
+    timestamps: "array.array[int]", start: int, end: int
+) -> list[tuple[int, int]]:
+    values = np.frombuffer(timestamps, dtype=np.int64)
+    rows = np.flatnonzero((values >= start) & (values <= end))
+    if len(rows) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1)
+    firsts = np.concatenate(([rows[0]], rows[breaks + 1]))
+    lasts = np.concatenate((rows[breaks], [rows[-1]]))
+    return [(int(first), int(last)) for first, last in zip(firsts, lasts)]
+
+
+@final
+class TimelineWidget(W.QWidget):
+    range_selected = C.pyqtSignal("qlonglong", "qlonglong")
+
+    bar_width = 4
+
+    def __init__(self, parent: W.QWidget | None = None):
+        super(TimelineWidget, self).__init__(parent)
+        self.setMinimumHeight(40)
+        self.setMaximumHeight(60)
+        self.setMouseTracking(True)
+        self.values = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.edges = np.zeros(0, dtype=np.int64)
+        self.selection: tuple[int, int] | None = None
+        self.pressed: int | None = None
+
+    def set_timestamps(self, timestamps: "array.array[int]") -> None:
+        values = np.frombuffer(timestamps, dtype=np.int64)
+        self.values = values[values != missing]
+        self.selection = None
+        self._update_histogram()
+
+    def _update_histogram(self) -> None:
+        if len(self.values) == 0:
+            self.counts = np.zeros(0, dtype=np.int64)
+            self.edges = np.zeros(0, dtype=np.int64)
+        else:
+            first = int(self.values.min())
+            last = int(self.values.max())
+            buckets = max(
+                1, min(self.width() // self.bar_width, last - first + 1)
+            )
+            self.edges = np.linspace(
+                first, last + 1, buckets + 1, dtype=np.float64
+            ).astype(np.int64)
+            self.counts, _ = np.histogram(self.values, bins=self.edges)
+        self.update()
+
+    def _get_bucket(self, x: float) -> int | None:
+        if len(self.counts) == 0:
+            return None
+        bucket = int(x * len(self.counts) / max(1, self.width()))
+        return min(max(bucket, 0), len(self.counts) - 1)
+
+    def _get_range(self, first: int, last: int) -> tuple[int, int]:
+        if first > last:
+            first, last = last, first
+        return int(self.edges[first]), int(self.edges[last + 1]) - 1
+
+    @override
+    def resizeEvent(self, a0: G.QResizeEvent | None) -> None:
+        super(TimelineWidget, self).resizeEvent(a0)
+        self._update_histogram()
+
+    @override
+    def paintEvent(self, a0: G.QPaintEvent | None) -> None:
+        painter = G.QPainter(self)
+        palette = self.palette()
+        painter.fillRect(self.rect(), palette.color(G.QPalette.ColorRole.Base))
+        if len(self.counts) == 0:
+            return
+        maximum = int(self.counts.max())
+        width = self.width() / len(self.counts)
+        height = self.height()
+        for bucket, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            selected = (
+                self.selection is not None
+                and self.selection[0] <= bucket <= self.selection[1]
+            )
+            color = palette.color(
+                G.QPalette.ColorRole.Highlight
+                if selected
+                else G.QPalette.ColorRole.Mid
+            )
+            bar_height = max(1, round(height * int(count) / maximum))
+            painter.fillRect(
+                C.QRectF(
+                    bucket * width,
+                    height - bar_height,
+                    max(1.0, width - 1),
+                    bar_height,
+                ),
+                color,
+            )
+
+    @override
+    def mousePressEvent(self, a0: G.QMouseEvent | None) -> None:
+        assert a0 is not None
+        self.pressed = self._get_bucket(a0.position().x())
+        if self.pressed is not None:
+            self.selection = (self.pressed, self.pressed)
+            self.update()
+
+    @override
+    def mouseMoveEvent(self, a0: G.QMouseEvent | None) -> None:
+        assert a0 is not None
+        bucket = self._get_bucket(a0.position().x())
+        if bucket is None:
+            return
+        if self.pressed is not None:
+            self.selection = (
+                min(self.pressed, bucket),
+                max(self.pressed, bucket),
+            )
+            self.update()
+        start, end = self._get_range(bucket, bucket)
+        date_format = "yyyy-MM-dd HH:mm"
+        self.setToolTip(
+            "{} – {}: {}".format(
+                to_datetime(start).toString(date_format),
+                to_datetime(end).toString(date_format),
+                int(self.counts[bucket]),
+            )
+        )
+
+    @override
+    def mouseReleaseEvent(self, a0: G.QMouseEvent | None) -> None:
+        assert a0 is not None
+        bucket = self._get_bucket(a0.position().x())
+        if self.pressed is None or bucket is None:
+            self.pressed = None
+            return
+        self.selection = (min(self.pressed, bucket), max(self.pressed, bucket))
+        start, end = self._get_range(self.pressed, bucket)
+        self.pressed = None
+        self.update()
+        self.range_selected.emit(start, end)
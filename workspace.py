@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import tempfile
+import traceback
+import urllib.parse
+from typing import Any
+
+import config
+
+default_name = "Default"
+
+apply_settings = [
+    "last_target_dir",
+    "prefix",
+    "decimals",
+    "copy",
+    "verify_copy",
+    "export",
+    "export_size",
+    "export_quality",
+    "merge",
+]
+
+
+def _get_directory() -> str:
+    return os.path.join(
+        os.path.dirname(os.path.abspath(config.config_file_name)),
+        "workspaces",
+    )
+
+
+def get_file_name(name: str, extension: str) -> str:
+    return os.path.join(
+        _get_directory(), urllib.parse.quote(name, safe="") + extension
+    )
+
+
+def get_names() -> list[str]:
+    names: list[str] = config.config.setdefault("workspaces", [default_name])
+    return names
+
+
+def get_current() -> str:
+    name: str = config.config.setdefault("workspace", default_name)
+    return name
+
+
+def load(name: str) -> dict[str, Any]:
+    try:
+        with open(get_file_name(name, ".json")) as f:
+            data: dict[str, Any] = json.load(f)
+            return data
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        print("Failed to load workspace " + name, file=sys.stderr)
+        traceback.print_exc()
+        return {}
+
+
+def save(name: str, data: dict[str, Any]) -> None:
+    directory = _get_directory()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            _ = f.write(json.dumps(data))
+        os.replace(temporary, get_file_name(name, ".json"))
+    except Exception:
+        print("Failed to save workspace " + name, file=sys.stderr)
+        traceback.print_exc()
+
+
+def remove(name: str) -> None:
+    for extension in (".json", ".log"):
+        try:
+            os.remove(get_file_name(name, extension))
+        except FileNotFoundError:
+            pass
+
+
+def get_settings() -> dict[str, Any]:
+    return {
+        key: config.config[key]
+        for key in apply_settings
+        if key in config.config
+    }
+
+
+def set_settings(settings: dict[str, Any]) -> None:
+    for key in apply_settings:
+        _ = config.config.pop(key, None)
+    config.config.update(settings)
+
+
+def migrate(log_file_name: str) -> None:
+    os.makedirs(_get_directory(), exist_ok=True)
+    if "workspaces" in config.config:
+        return
+    name = get_current()
+    _ = get_names()
+    items = config.config.pop("items", None)
+    if items is not None:
+        save(name, {"items": items, "settings": get_settings()})
+        if os.path.exists(log_file_name):
+            os.replace(log_file_name, get_file_name(name, ".log"))
+    config.save_config()